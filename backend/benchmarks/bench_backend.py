@@ -0,0 +1,182 @@
+# benchmarks/bench_backend.py – offline throughput/latency benchmark for the FastAPI backend
+#
+# Run from the backend directory:
+#   python -m benchmarks.bench_backend --endpoint simulate --concurrency 1,8,32 --turns 5,20
+#
+# The LangSmith client and all three chat model families are replaced by the
+# fakes in benchmarks/fakes.py, so no API keys or network access are needed.
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+# Every workspace needs a key for resolve_api_key(); set before main.py loads .env
+for _var in ("LANGSMITH_API_KEY_MAIDSAT", "LANGSMITH_API_KEY_RESOLVERS", "LANGSMITH_API_KEY_SALES"):
+    os.environ.setdefault(_var, "bench")
+# Keep benchmark cache/checkpoint files out of the real ones
+_bench_dir = tempfile.mkdtemp(prefix="bench_backend_")
+os.environ.setdefault("SHARED_CACHE_PATH", os.path.join(_bench_dir, "shared_cache.sqlite3"))
+os.environ.setdefault("CHECKPOINT_DB", os.path.join(_bench_dir, "checkpoints.sqlite3"))
+
+import httpx
+
+from benchmarks.fakes import FakeBehaviour, install
+
+WORKSPACE = "Sales"
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def make_chat(turns, index=0):
+    # The index makes each request's chat distinct, so identical requests are not coalesced
+    chat = []
+    for i in range(turns):
+        chat.append({"role": "human", "content": f"Request {index} question {i}: " + "lorem ipsum " * 20})
+        chat.append({"role": "ai", "content": f"Original answer {i}"})
+    return chat
+
+
+async def monitor_loop_lag(samples, stop, interval=0.01):
+    """Records how late each wake-up is; large values mean the event loop was blocked."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+def build_request(endpoint, turns, model, priority="batch", index=0):
+    if endpoint == "simulate":
+        payload = json.dumps(make_chat(turns, index))
+        return "POST", "/simulate", {
+            "files": {"file": ("chat.json", payload, "application/json")},
+            "data": {
+                "prompt_id": "bench/prompt-0",
+                "model_name": model,
+                "variables_json": json.dumps({"agent_name": "Bench"}),
+                "workspace": WORKSPACE,
+                "priority": priority,
+            },
+        }
+    if endpoint == "prompts":
+        return "GET", "/prompts", {"params": {"workspace": WORKSPACE}}
+    if endpoint == "prompt-variables":
+        return "GET", "/prompt-variables", {"params": {"prompt_id": "bench/prompt-0", "workspace": WORKSPACE}}
+    raise ValueError(f"Unknown endpoint: {endpoint}")
+
+
+async def run_scenario(app, endpoint, concurrency, turns, total_requests, model, priority="batch", identical=False):
+    latencies = []
+    statuses = {}
+    lag_samples = []
+    stop = asyncio.Event()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(index):
+            method, path, kwargs = build_request(endpoint, turns, model, priority, 0 if identical else index)
+            async with semaphore:
+                start = time.perf_counter()
+                res = await client.request(method, path, **kwargs)
+                latencies.append(time.perf_counter() - start)
+                statuses[res.status_code] = statuses.get(res.status_code, 0) + 1
+
+        lag_task = asyncio.create_task(monitor_loop_lag(lag_samples, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total_requests)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await lag_task
+
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "turns": turns if endpoint == "simulate" else None,
+        "identical": identical,
+        "requests": total_requests,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total_requests / elapsed, 2) if elapsed else 0.0,
+        "p50_s": round(percentile(latencies, 50), 4),
+        "p95_s": round(percentile(latencies, 95), 4),
+        "p99_s": round(percentile(latencies, 99), 4),
+        "mean_s": round(statistics.fmean(latencies), 4) if latencies else 0.0,
+        "loop_lag_p99_ms": round(percentile(lag_samples, 99) * 1000, 2),
+        "loop_lag_max_ms": round(max(lag_samples, default=0.0) * 1000, 2),
+        "statuses": statuses,
+    }
+
+
+def print_table(rows):
+    header = ["endpoint", "conc", "turns", "reqs", "rps", "p50", "p95", "p99", "lag p99 ms", "lag max ms", "statuses"]
+    print(" | ".join(header))
+    for r in rows:
+        print(" | ".join(str(v) for v in [
+            r["endpoint"], r["concurrency"], r["turns"] or "-", r["requests"], r["throughput_rps"],
+            r["p50_s"], r["p95_s"], r["p99_s"], r["loop_lag_p99_ms"], r["loop_lag_max_ms"], r["statuses"],
+        ]))
+
+
+def parse_int_list(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the backend against fake LLM/LangSmith stand-ins.")
+    parser.add_argument("--endpoint", choices=["simulate", "prompts", "prompt-variables"], default="simulate")
+    parser.add_argument("--concurrency", type=parse_int_list, default=[1, 4, 16])
+    parser.add_argument("--turns", type=parse_int_list, default=[5])
+    parser.add_argument("--requests", type=int, default=32, help="Requests per scenario")
+    parser.add_argument("--model", default="claude:claude-3-haiku-20240307")
+    parser.add_argument("--priority", choices=["interactive", "batch"], default="batch")
+    parser.add_argument("--identical", action="store_true",
+                        help="Send the same chat in every /simulate request to measure coalescing")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake model latency per turn (s)")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--prompt-latency", type=float, default=0.02, help="Fake LangSmith latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--prompt-cache-ttl", type=int, default=0,
+                        help="Shared prompt cache TTL (s); 0 measures uncached upstream calls")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--json", dest="json_out", help="Also write results to this JSON file")
+    args = parser.parse_args()
+    # Read by prompts.py at import time, which happens inside install()
+    os.environ["PROMPT_CACHE_TTL_SECONDS"] = str(args.prompt_cache_ttl)
+
+    behaviour = FakeBehaviour(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        prompt_pull_latency=args.prompt_latency,
+        list_latency=args.prompt_latency,
+        seed=args.seed,
+    )
+    app = install(behaviour)
+
+    rows = []
+    turn_options = args.turns if args.endpoint == "simulate" else [0]
+    for turns in turn_options:
+        for concurrency in args.concurrency:
+            rows.append(asyncio.run(run_scenario(app, args.endpoint, concurrency, turns, args.requests, args.model,
+                                                 args.priority, args.identical)))
+
+    print_table(rows)
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
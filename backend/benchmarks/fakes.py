@@ -0,0 +1,137 @@
+# benchmarks/fakes.py – offline stand-ins for the LangSmith client and chat models
+
+import hashlib
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+
+class FakeBehaviour:
+    """Shared knobs for the fakes: latency in seconds plus error and 429 probabilities."""
+
+    def __init__(self, latency=0.2, jitter=0.05, error_rate=0.0, rate_limit_rate=0.0,
+                 prompt_pull_latency=0.05, list_latency=0.05, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.prompt_pull_latency = prompt_pull_latency
+        self.list_latency = list_latency
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sleep(self, base):
+        with self._lock:
+            delay = max(0.0, base + self._rng.uniform(-self.jitter, self.jitter)) if base else 0.0
+        # Blocking on purpose: the real SDK calls are synchronous too
+        time.sleep(delay)
+
+    def maybe_fail(self):
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.rate_limit_rate:
+            raise RuntimeError("Error code: 429 - rate limit exceeded")
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise RuntimeError("Error code: 500 - fake model failure")
+
+
+def _text(content):
+    # Cache-marked history messages carry a list of content blocks
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content)
+
+
+class FakeChatModel:
+    """Stands in for ChatAnthropic / ChatOpenAI / ChatGoogleGenerativeAI."""
+
+    def __init__(self, family, model, behaviour):
+        self.family = family
+        self.model = model
+        self.behaviour = behaviour
+
+    def invoke(self, inputs):
+        self.behaviour.sleep(self.behaviour.latency)
+        self.behaviour.maybe_fail()
+        if isinstance(inputs, str):
+            # Direct llm.invoke(text), e.g. history summaries
+            inputs = {"chat_history": [{"role": "human", "content": inputs}], "question": inputs}
+        history = inputs.get("chat_history", [])
+        prompt_tokens = 50 + sum(len(_text(m["content"])) // 4 for m in history)
+        content = f"[{self.family}:{self.model}] reply to: {inputs.get('question', '')[:40]}"
+        return SimpleNamespace(
+            content=content,
+            usage_metadata={"input_tokens": prompt_tokens, "output_tokens": len(content) // 4},
+            response_metadata={},
+        )
+
+
+class FakeChain:
+    def __init__(self, prompt, llm):
+        self.prompt = prompt
+        self.llm = llm
+
+    def invoke(self, inputs):
+        return self.llm.invoke(inputs)
+
+
+class FakePrompt:
+    def __init__(self, prompt_id, input_variables):
+        self.prompt_id = prompt_id
+        self.input_variables = input_variables
+
+    def __or__(self, llm):
+        return FakeChain(self, llm)
+
+
+class FakeLangSmithClient:
+    """Implements the subset of ``langsmith.Client`` the backend uses."""
+
+    behaviour = FakeBehaviour()
+    prompt_count = 250
+
+    def __init__(self, api_key=None, **kwargs):
+        self.api_key = api_key
+
+    def pull_prompt(self, prompt_id):
+        self.behaviour.sleep(self.behaviour.prompt_pull_latency)
+        return FakePrompt(prompt_id, ["chat_history", "question", "agent_name", "policy"])
+
+    def get_prompt(self, prompt_identifier):
+        self.behaviour.sleep(self.behaviour.prompt_pull_latency)
+        # Prompts never change here, so each has one fixed latest commit
+        return SimpleNamespace(last_commit_hash=hashlib.sha256(prompt_identifier.encode("utf-8")).hexdigest()[:8])
+
+    def list_prompts(self, limit=100, offset=0, is_public=None):
+        self.behaviour.sleep(self.behaviour.list_latency)
+        repos = [
+            SimpleNamespace(full_name=f"bench/prompt-{i}")
+            for i in range(offset, min(offset + limit, self.prompt_count))
+        ]
+        # Iterating a real ListPromptsResponse yields (field, value) pairs
+        return _FakeListResponse(repos)
+
+
+class _FakeListResponse:
+    def __init__(self, repos):
+        self.repos = repos
+
+    def __iter__(self):
+        yield "repos", self.repos
+        yield "total", len(self.repos)
+
+
+def install(behaviour):
+    """Patch the backend modules in place so no network call leaves the process."""
+    import main
+    import prompts
+
+    FakeLangSmithClient.behaviour = behaviour
+    prompts.Client = FakeLangSmithClient
+
+    # Replace the real families in the provider registry, so no SDK is ever imported
+    from providers import register_provider
+    for family in ("claude", "openai", "gemini"):
+        register_provider(family, lambda model, family=family: FakeChatModel(family, model, behaviour))
+    return main.app
@@ -0,0 +1,54 @@
+# cancellation.py – cooperative cancellation of running simulations
+#
+# Simulations run in worker threads and cannot be interrupted mid model call,
+# so they check between turns and stop there. Checkpoints are kept, so a
+# cancelled run can still be resumed later with the same run_id.
+
+import threading
+import time
+
+from shared_cache import CACHE
+
+CANCEL_TTL_SECONDS = 24 * 3600
+
+
+class SimulationCancelled(Exception):
+    pass
+
+
+def cancel_run(run_id):
+    # Stored in the shared cache so a cancel reaching any worker stops the run everywhere
+    CACHE.set(f"cancel:{run_id}", time.time(), CANCEL_TTL_SECONDS)
+
+
+def is_run_cancelled(run_id, since):
+    """True if ``run_id`` was cancelled after ``since``; resuming a run later starts afresh."""
+    return bool(run_id) and CACHE.get(f"cancel:{run_id}", 0) >= since
+
+
+class InterestTracker:
+    """Counts the requests still waiting on each in-flight simulation.
+
+    Coalesced requests share one simulation, so it is only abandoned once the
+    last interested request has disconnected or been cancelled.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def add(self, key):
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def drop(self, key):
+        with self._lock:
+            remaining = self._counts.get(key, 0) - 1
+            if remaining > 0:
+                self._counts[key] = remaining
+            else:
+                self._counts.pop(key, None)
+
+    def abandoned(self, key):
+        with self._lock:
+            return self._counts.get(key, 0) == 0
@@ -4,59 +4,141 @@ import os
 os.environ["LANGCHAIN_TRACING_V2"] = "false"
 
 from dotenv import load_dotenv
-from langsmith import Client
-from langchain_anthropic import ChatAnthropic
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
 
-load_dotenv()
+import time
 
-def simulate_chat(messages, prompt_id, model_name, langsmith_api_key, extra_vars=None):
-    # Set LangSmith API key
-    client = Client(api_key=langsmith_api_key)
-    prompt = client.pull_prompt(prompt_id)
+from metrics import STAGE_LATENCY, LLM_TOKENS, bounded_label
+from usage import turn_usage, conversation_usage
+from history import HistoryWindow, SUMMARY_PROMPT, format_for_summary
+from prompt_cache import supports_explicit_caching, mark_cache_breakpoint
+from checkpoints import CHECKPOINTS
+from providers import build_llm, load_provider_config, registered_families
+from prompts import pull_prompt, prompt_commit
+from cancellation import SimulationCancelled
 
-    # Parse model family
+load_dotenv()
+load_provider_config()
+
+def parse_model_name(model_name):
+    """Split ``family:submodel``; a bare name is treated as a Claude model."""
     if ":" in model_name:
         family, submodel = model_name.split(":", 1)
     else:
         family, submodel = "claude", model_name
+    return family, submodel
 
-    # ✅ Set API keys via env vars only, NOT as constructor args
-    if family == "claude":
-        os.environ["ANTHROPIC_API_KEY"] = os.environ.get("ANTHROPIC_API_KEY")
-        llm = ChatAnthropic(model=submodel)
+def simulate_chat(messages, prompt_id, model_name, langsmith_api_key, extra_vars=None, workspace="",
+                  history_strategy="full", history_limit=None, prompt_caching=True, checkpoint_key=None,
+                  should_stop=None):
+    history, _ = simulate_chat_with_usage(messages, prompt_id, model_name, langsmith_api_key, extra_vars, workspace,
+                                          history_strategy=history_strategy, history_limit=history_limit,
+                                          prompt_caching=prompt_caching, checkpoint_key=checkpoint_key,
+                                          should_stop=should_stop)
+    return history
 
-    elif family == "openai":
-        os.environ["OPENAI_API_KEY"] = os.environ.get("OPENAI_API_KEY")
-        llm = ChatOpenAI(model=submodel)
+def simulate_chat_with_usage(messages, prompt_id, model_name, langsmith_api_key, extra_vars=None, workspace="",
+                             history_strategy="full", history_limit=None, prompt_caching=True, checkpoint_key=None,
+                             should_stop=None):
+    """Like ``simulate_chat`` but also returns per-turn and total token/latency/cost usage.
 
-    elif family == "gemini":
-        os.environ["GOOGLE_API_KEY"] = os.environ.get("GEMINI_API_KEY")
-        llm = ChatGoogleGenerativeAI(
-            model=submodel,
-            convert_system_message_to_human=True
-        )
+    With a ``checkpoint_key`` progress is saved after every turn; calling again
+    with the same key after a failure resumes at the first unanswered turn.
+    ``should_stop`` is checked before each turn; when it returns True the
+    simulation raises ``SimulationCancelled`` and keeps its checkpoint.
+    """
+    family = bounded_label(parse_model_name(model_name)[0], registered_families())
+    with STAGE_LATENCY.time(stage="conversation", family=family, workspace=workspace):
+        return _simulate_chat(messages, prompt_id, model_name, langsmith_api_key, extra_vars, workspace,
+                              history_strategy, history_limit, prompt_caching, checkpoint_key, should_stop)
 
-    else:
-        raise ValueError(f"Unsupported model family: {family}")
+def _simulate_chat(messages, prompt_id, model_name, langsmith_api_key, extra_vars, workspace,
+                   history_strategy, history_limit, prompt_caching, checkpoint_key, should_stop):
+    # Parse model family
+    family, submodel = parse_model_name(model_name)
+    # The model name is client input: unregistered families share one "unknown" series
+    labels = {"family": bounded_label(family, registered_families()), "workspace": workspace}
+
+    # Set LangSmith API key
+    with STAGE_LATENCY.time(stage="prompt_pull", **labels):
+        prompt = pull_prompt(langsmith_api_key, prompt_id)
+
+    with STAGE_LATENCY.time(stage="llm_construction", **labels):
+        llm = _build_llm(family, submodel)
+
+    # Summaries are extra model calls; account for them separately from turns
+    summary_calls = []
+
+    def summarize(previous, evicted):
+        start = time.perf_counter()
+        result = llm.invoke(SUMMARY_PROMPT.format(summary=previous or "(none)", messages=format_for_summary(evicted)))
+        latency = time.perf_counter() - start
+        STAGE_LATENCY.observe(latency, stage="summary", **labels)
+        summary_calls.append(turn_usage(len(summary_calls), result, latency, submodel, family))
+        return result.content
+
+    window = HistoryWindow(history_strategy, history_limit, summarize)
+    mark_cache = prompt_caching and supports_explicit_caching(family)
 
     # Run the simulation
     chain = prompt | llm
     history = []
     new_responses = []
+    turns = []
+
+    checkpoint = CHECKPOINTS.load(checkpoint_key) if checkpoint_key else None
+    if checkpoint:
+        history = checkpoint["history"]
+        turns = checkpoint["turns"]
+        summary_calls.extend(checkpoint["overhead"])
+        window.restore(checkpoint["window"])
+        new_responses = [m for m in history if m["role"] == "ai"]
+    resumed_turns = len(turns)
 
+    human_index = 0
     for msg in messages:
         if msg["role"] == "human":
+            human_index += 1
+            if human_index <= resumed_turns:
+                continue
+            # Nobody is waiting for the result any more: free the worker thread
+            if should_stop and should_stop():
+                raise SimulationCancelled(f"Cancelled before turn {human_index}")
             history.append({"role": "human", "content": msg["content"]})
+            chat_history = window.view(history)
+            if mark_cache:
+                chat_history = mark_cache_breakpoint(chat_history)
             inputs = {
-                "chat_history": history,
+                "chat_history": chat_history,
                 "question": msg["content"]
             }
             if extra_vars:
                 inputs.update(extra_vars)
+            start = time.perf_counter()
             result = chain.invoke(inputs)
+            latency = time.perf_counter() - start
+            STAGE_LATENCY.observe(latency, stage="turn", **labels)
             history.append({"role": "ai", "content": result.content})
             new_responses.append({"role": "ai", "content": result.content})
 
-    return history
+            turn = turn_usage(len(turns), result, latency, submodel, family)
+            turns.append(turn)
+            for kind in ("prompt", "completion", "cache_read", "cache_write"):
+                if turn[f"{kind}_tokens"]:
+                    LLM_TOKENS.inc(turn[f"{kind}_tokens"], kind=kind, **labels)
+
+            if checkpoint_key:
+                CHECKPOINTS.save(checkpoint_key, {
+                    "history": history, "turns": turns, "overhead": summary_calls, "window": window.state(),
+                })
+
+    if checkpoint_key:
+        CHECKPOINTS.delete(checkpoint_key)
+    usage = conversation_usage(turns, overhead=summary_calls)
+    usage["resumed_turns"] = resumed_turns
+    # Lets clients tell whether a stored result is still current for this prompt
+    usage["prompt_commit"] = prompt_commit(prompt, prompt_id)
+    return history, usage
+
+def _build_llm(family, submodel):
+    # Provider SDKs are imported on first use; see providers.py
+    return build_llm(family, submodel)
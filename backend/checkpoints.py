@@ -0,0 +1,72 @@
+# checkpoints.py – per-turn progress of in-flight simulations, so a failed run can resume
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", os.path.join(os.path.dirname(__file__), "checkpoints.sqlite3"))
+CHECKPOINT_TTL_SECONDS = int(os.getenv("CHECKPOINT_TTL_SECONDS", str(24 * 3600)))
+
+
+def checkpoint_key(run_id, chat, prompt_id, model_name, variables, history_strategy, history_limit):
+    """Stable key for one conversation within one run; any input change starts a fresh checkpoint."""
+    payload = json.dumps(
+        [run_id, chat, prompt_id, model_name, variables, history_strategy, history_limit],
+        sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CheckpointStore:
+    """SQLite-backed store of ``{history, turns, overhead, window}`` snapshots.
+
+    A connection is opened per call so the store is safe to use from the
+    threadpool workers FastAPI runs sync code on.
+    """
+
+    def __init__(self, path=CHECKPOINT_DB, ttl_seconds=CHECKPOINT_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " key TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS checkpoints_updated_at ON checkpoints (updated_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commits on success, rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def load(self, key):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT state, updated_at FROM checkpoints WHERE key = ?", (key,)
+            ).fetchone()
+        if not row or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return json.loads(row[0])
+
+    def save(self, key, state):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (key, state, updated_at) VALUES (?, ?, ?)",
+                (key, json.dumps(state), now),
+            )
+            conn.execute("DELETE FROM checkpoints WHERE updated_at < ?", (now - self.ttl_seconds,))
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM checkpoints WHERE key = ?", (key,))
+
+
+CHECKPOINTS = CheckpointStore()
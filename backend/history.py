@@ -0,0 +1,112 @@
+# history.py – strategies for bounding the chat_history sent to the model on each turn
+
+# strategy -> default limit (turns for last_n/summary, tokens for token_budget)
+STRATEGIES = {
+    "full": None,
+    "last_n": 6,
+    "token_budget": 4000,
+    "summary": 6,
+}
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation below between a customer (human) and an assistant (ai). "
+    "Keep names, facts, commitments and open questions; drop pleasantries. "
+    "Reply with the summary only.\n\n"
+    "Existing summary:\n{summary}\n\nNew messages:\n{messages}"
+)
+
+
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for budgeting across providers
+    return max(1, len(text) // 4)
+
+
+def validate_strategy(strategy, limit=None):
+    """Return ``(strategy, limit)`` with defaults applied; raise ValueError if invalid."""
+    strategy = (strategy or "full").strip()
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown history strategy '{strategy}'. Expected one of: {', '.join(STRATEGIES)}")
+    if strategy == "full":
+        return strategy, None
+    if limit is None:
+        limit = STRATEGIES[strategy]
+    if not isinstance(limit, int) or limit < 1:
+        raise ValueError(f"History limit for '{strategy}' must be a positive integer")
+    return strategy, limit
+
+
+def _last_n_start(history, n):
+    """Index of the human message that starts the last ``n`` completed turns (plus the current one)."""
+    human_indexes = [i for i, m in enumerate(history) if m["role"] == "human"]
+    # The final human message is the current question; keep n turns before it
+    keep = human_indexes[-(n + 1):]
+    return keep[0] if keep else 0
+
+
+def _token_budget_start(history, budget):
+    start = len(history) - 1
+    used = estimate_tokens(history[start]["content"]) if history else 0
+    for i in range(len(history) - 2, -1, -1):
+        used += estimate_tokens(history[i]["content"])
+        if used > budget:
+            break
+        if history[i]["role"] == "human":
+            start = i
+    return max(start, 0)
+
+
+class HistoryWindow:
+    """Chooses the slice of the running history that is sent with each turn.
+
+    The full history is still built and returned by the simulator; only the
+    ``chat_history`` input is bounded. With ``summary`` the messages that fall
+    out of the last-N window are folded into a rolling summary, each message
+    exactly once, via the ``summarize(previous_summary, messages)`` callable.
+    Turns are folded in chunks of ``summary_chunk`` (default N), so only one
+    turn in every chunk pays for the extra summary call; in between, up to
+    N + chunk - 1 turns are sent verbatim.
+    """
+
+    def __init__(self, strategy="full", limit=None, summarize=None, summary_chunk=None):
+        self.strategy, self.limit = validate_strategy(strategy, limit)
+        if self.strategy == "summary" and summarize is None:
+            raise ValueError("The summary history strategy needs a summarize callable")
+        self.summarize = summarize
+        self.summary_chunk = max(1, summary_chunk or self.limit or 1)
+        self.summary = ""
+        self._summarized_upto = 0
+
+    def state(self):
+        return {"summary": self.summary, "summarized_upto": self._summarized_upto}
+
+    def restore(self, state):
+        self.summary = state.get("summary", "")
+        self._summarized_upto = state.get("summarized_upto", 0)
+
+    def view(self, history):
+        if self.strategy == "full":
+            return history
+        if self.strategy == "token_budget":
+            return history[_token_budget_start(history, self.limit):]
+
+        start = _last_n_start(history, self.limit)
+        if self.strategy == "last_n":
+            return history[start:]
+
+        evicted = history[self._summarized_upto:start]
+        if sum(m["role"] == "human" for m in evicted) >= self.summary_chunk:
+            self.summary = self.summarize(self.summary, evicted)
+            self._summarized_upto = start
+        # Turns waiting for the next chunk stay verbatim
+        start = self._summarized_upto
+        if not self.summary:
+            return history[start:]
+        # A human/ai pair keeps role alternation valid for every provider
+        return [
+            {"role": "human", "content": "Before we continue, summarize our conversation so far."},
+            {"role": "ai", "content": f"Summary of the earlier conversation: {self.summary}"},
+        ] + history[start:]
+
+
+def format_for_summary(messages):
+    return "\n".join(f"{m['role']}: {m['content']}" for m in messages)
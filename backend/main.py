@@ -1,17 +1,84 @@
-from fastapi import FastAPI, UploadFile, Form, HTTPException
-from chat_simulator import simulate_chat
-from langsmith import Client
+from fastapi import FastAPI, UploadFile, Form, HTTPException, Request
+import asyncio
+from chat_simulator import simulate_chat_with_usage, parse_model_name
+from prompts import list_prompt_names, prompt_variables, resolve_prompt_commit
 import json
 from dotenv import load_dotenv
 import os
 import re
+import time
 from fastapi import Query
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, Response, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from metrics import HTTP_REQUESTS, HTTP_LATENCY, SIMULATION_ERRORS, STAGE_LATENCY, COALESCED_REQUESTS, render_metrics, bounded_label
+from usage import LEDGER
+from history import validate_strategy
+from checkpoints import checkpoint_key
+from single_flight import AsyncSingleFlight, request_key
+from cancellation import SimulationCancelled, InterestTracker, cancel_run, is_run_cancelled
+from scheduler import SCHEDULER, PRIORITIES
+from providers import registered_families
 
 load_dotenv()
 
 app = FastAPI()
 
+SIMULATIONS = AsyncSingleFlight()
+# Requests still waiting on each simulation; at zero the simulation stops before its next turn
+SIMULATION_INTEREST = InterestTracker()
+CANCEL_POLL_SECONDS = float(os.getenv("CANCEL_POLL_SECONDS", "0.5"))
+
+KEY_MAPPING = {
+    "MaidsAT-Delighters-Doctors": "LANGSMITH_API_KEY_MAIDSAT",
+    "Resolvers": "LANGSMITH_API_KEY_RESOLVERS",
+    "Sales": "LANGSMITH_API_KEY_SALES"
+}
+
+def metric_labels(family, workspace):
+    # Labels come from client input; anything unrecognized is folded into "unknown"
+    return {"family": bounded_label(family, registered_families()), "workspace": bounded_label(workspace, KEY_MAPPING)}
+
+def resolve_api_key(workspace, family=""):
+    with STAGE_LATENCY.time(stage="key_resolution", **metric_labels(family, workspace)):
+        selected_key = KEY_MAPPING.get(workspace)
+        return os.getenv(selected_key) if selected_key else None
+
+def is_rate_limit_error(e):
+    err_msg = str(e).lower()
+    return "quota" in err_msg or "rate limit" in err_msg or "exceeded" in err_msg or "overloaded" in err_msg
+
+def record_error(endpoint, error_class, family="", workspace=""):
+    SIMULATION_ERRORS.inc(endpoint=endpoint, error_class=error_class, **metric_labels(family, workspace))
+
+async def wait_for_abort(request, run_id, since):
+    """Returns once the client disconnects or the run is cancelled through /runs/{run_id}/cancel."""
+    while True:
+        if await request.is_disconnected():
+            return "disconnected"
+        if is_run_cancelled(run_id, since):
+            return "cancelled"
+        await asyncio.sleep(CANCEL_POLL_SECONDS)
+
+def consume_result(task):
+    # Simulations outlive requests that gave up on them; don't log their errors as unretrieved
+    if not task.cancelled():
+        task.exception()
+
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw URL, to keep cardinality bounded
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        HTTP_REQUESTS.inc(method=request.method, path=path, status=status)
+        HTTP_LATENCY.observe(time.perf_counter() - start, method=request.method, path=path)
+
 from fastapi.middleware.cors import CORSMiddleware
 
 app.add_middleware(
@@ -24,28 +91,39 @@ app.add_middleware(
 
 @app.post("/simulate")
 async def simulate(
+    request: Request,
     file: UploadFile = None,
     prompt_id: str = Form(...),
     model_name: str = Form(...),
     variables_json: str = Form("{}", description="User-provided variables as JSON string"),
-    workspace: str = Form(...)
+    workspace: str = Form(...),
+    include_usage: bool = Form(False, description="Return {history, usage} instead of the bare history list"),
+    run_id: str = Form("", description="Optional run identifier; aggregates usage and makes the run resumable"),
+    dataset: str = Form("", description="Optional dataset name used to aggregate usage"),
+    history_strategy: str = Form("full", description="full, last_n, token_budget or summary"),
+    history_limit: int = Form(None, description="Turns (last_n, summary) or tokens (token_budget)"),
+    prompt_caching: bool = Form(True, description="Mark the repeated prompt prefix for provider-side caching"),
+    priority: str = Form("batch", description="interactive (single checks from the UI) or batch (bulk runs)")
 ):
+    family = parse_model_name(model_name)[0] if model_name.strip() else ""
     if file is None:
+        record_error("simulate", "validation", family, workspace)
         raise HTTPException(status_code=400, detail="No file uploaded. Please upload a chat JSON file.")
     if not file.filename.endswith(".json"):
+        record_error("simulate", "validation", family, workspace)
         raise HTTPException(status_code=400, detail="Only .json files are accepted. Please upload a valid JSON file.")
     if prompt_id.strip() == "":
+        record_error("simulate", "validation", family, workspace)
         raise HTTPException(status_code=400, detail="Prompt ID is missing. Please enter a LangSmith prompt ID.")
     if model_name.strip() == "":
+        record_error("simulate", "validation", family, workspace)
         raise HTTPException(status_code=400, detail="Model name is missing. Please select a model.")
-    key_mapping = {
-    "MaidsAT-Delighters-Doctors": "LANGSMITH_API_KEY_MAIDSAT",
-    "Resolvers": "LANGSMITH_API_KEY_RESOLVERS",
-    "Sales": "LANGSMITH_API_KEY_SALES"
-    }
-    selected_key = key_mapping.get(workspace)
-    api_key = os.getenv(selected_key)
+    if priority not in PRIORITIES:
+        record_error("simulate", "validation", family, workspace)
+        raise HTTPException(status_code=400, detail=f"Invalid priority. Use one of: {', '.join(PRIORITIES)}.")
+    api_key = resolve_api_key(workspace, family)
     if not api_key:
+        record_error("simulate", "validation", family, workspace)
         raise HTTPException(status_code=400, detail="Invalid workspace.")
     # Load uploaded JSON content
     try:
@@ -64,6 +142,7 @@ async def simulate(
                 detail="Uploaded JSON must be a list of messages with 'role' ('human' or 'ai') and non-empty 'content'."
             )
     except Exception as e:
+        record_error("simulate", "validation", family, workspace)
         raise HTTPException(status_code=400, detail=f"Uploaded file is not valid JSON. Error: {str(e)}")
 
     # Parse dynamic variables from frontend
@@ -71,58 +150,104 @@ async def simulate(
         user_vars = json.loads(variables_json)
         assert isinstance(user_vars, dict)
     except Exception as e:
+        record_error("simulate", "validation", family, workspace)
         raise HTTPException(status_code=400, detail=f"Invalid variables JSON: {str(e)}")
 
+    try:
+        history_strategy, history_limit = validate_strategy(history_strategy, history_limit)
+    except ValueError as e:
+        record_error("simulate", "validation", family, workspace)
+        raise HTTPException(status_code=400, detail=f"Invalid history settings: {str(e)}")
+
+    # Resumable only when the client names the run
+    key = None
+    if run_id:
+        key = checkpoint_key(run_id, chat, prompt_id, model_name, user_vars, history_strategy, history_limit)
+
+    # Identical simulations already running (same chat, prompt, model, variables and
+    # history settings, in the same workspace) are joined instead of re-run
+    flight_key = request_key(workspace, chat, prompt_id, model_name, user_vars,
+                             history_strategy, history_limit, prompt_caching)
+
+    async def run_simulation():
+        # Waits behind higher-priority work; workspaces share the slots of each class fairly
+        async with SCHEDULER.slot(priority, workspace, key=flight_key):
+            if SIMULATION_INTEREST.abandoned(flight_key):
+                raise SimulationCancelled("Cancelled while queued")
+            history, usage = await run_in_threadpool(
+                simulate_chat_with_usage, chat, prompt_id, model_name, api_key, user_vars, workspace=workspace,
+                history_strategy=history_strategy, history_limit=history_limit,
+                prompt_caching=prompt_caching, checkpoint_key=key,
+                should_stop=lambda: SIMULATION_INTEREST.abandoned(flight_key),
+            )
+        # Recorded by the simulation itself, so usage counts even if its first caller left
+        LEDGER.record(usage, run_id=run_id, dataset=dataset)
+        return history, usage
+
     # Simulate conversation
+    SIMULATION_INTEREST.add(flight_key)
+    watcher = asyncio.ensure_future(wait_for_abort(request, run_id, time.time()))
     try:
-        result = simulate_chat(chat, prompt_id, model_name, api_key, user_vars)
-        return result
+        while True:
+            # Joining a batch simulation still in the queue must not make an interactive check wait behind the batch
+            SCHEDULER.promote(flight_key, priority)
+            simulation = asyncio.ensure_future(SIMULATIONS.do(flight_key, run_simulation))
+            simulation.add_done_callback(consume_result)
+            await asyncio.wait({simulation, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if not simulation.done():
+                # Leave the simulation running for any coalesced callers; it stops once none remain
+                record_error("simulate", "cancelled", family, workspace)
+                return JSONResponse(status_code=499, content={"detail": f"Simulation {watcher.result()}."})
+            if not isinstance(simulation.exception(), SimulationCancelled):
+                break
+            # Joined a simulation just as all its other callers left: run it again for this one
+
+        (history, usage), shared = simulation.result()
+        if shared:
+            # The tokens were spent once, by the request that ran it
+            COALESCED_REQUESTS.inc(endpoint="simulate")
+            usage = {**usage, "coalesced": True}
+        if include_usage:
+            return {"history": history, "usage": usage}
+        return history
 
     except ValueError as e:
+        record_error("simulate", "model", family, workspace)
         raise HTTPException(status_code=400, detail=f"Model or prompt error: {str(e)}")
 
     except Exception as e:
-        err_msg = str(e).lower()
-        if "quota" in err_msg or "rate limit" in err_msg or "exceeded" in err_msg or "overloaded" in err_msg:
+        if is_rate_limit_error(e):
+            record_error("simulate", "rate_limit", family, workspace)
             return JSONResponse(
                 status_code=429,
                 content={"detail": "Rate limit or quota exceeded for this model. Please try again later or switch models."}
             )
+        record_error("simulate", "upstream", family, workspace)
         raise HTTPException(status_code=500, detail=f"Simulation failed: {str(e)}")
-    
+
+    finally:
+        watcher.cancel()
+        SIMULATION_INTEREST.drop(flight_key)
+
+@app.post("/runs/{run_id}/cancel")
+def cancel_simulation_run(run_id: str):
+    # Conversations of the run stop before their next turn; checkpoints are kept so the run can resume
+    cancel_run(run_id)
+    return {"run_id": run_id, "cancelled": True}
+
 @app.get("/prompts")
 def list_prompts(workspace: str = Query(...)):
-    key_mapping = {
-        "MaidsAT-Delighters-Doctors": "LANGSMITH_API_KEY_MAIDSAT",
-        "Resolvers": "LANGSMITH_API_KEY_RESOLVERS",
-        "Sales": "LANGSMITH_API_KEY_SALES"
-    }
-    selected_key = key_mapping.get(workspace)
-    api_key = os.getenv(selected_key)
+    api_key = resolve_api_key(workspace)
     if not api_key:
+        record_error("prompts", "validation", workspace=workspace)
         raise HTTPException(status_code=400, detail="Invalid workspace.")
     
     try:
-        client = Client(api_key=api_key)
-        offset = 0
-        limit = 100
-        prompt_names = []
-
-        while True:
-            response = client.list_prompts(limit=limit, offset=offset, is_public=False)
-
-            if not response.repos:
-                break
-
-            for id, p in response:
-                if id == "repos":
-                    for prompt in p:
-                        prompt_names.append(prompt.full_name)
-
-            offset += limit
-        return prompt_names
+        with STAGE_LATENCY.time(stage="prompt_list", family="", workspace=workspace):
+            return list_prompt_names(api_key)
 
     except Exception as e:
+        record_error("prompts", "rate_limit" if is_rate_limit_error(e) else "upstream", workspace=workspace)
         raise HTTPException(status_code=500, detail=f"Failed to fetch prompts: {str(e)}")
 
 @app.get("/")
@@ -134,27 +259,58 @@ async def root_head() -> Response:
     # A HEAD response should contain headers only, no body
     return Response(status_code=200)
 
+@app.get("/usage")
+def get_usage(run_id: str = Query(None), dataset: str = Query(None)):
+    # Totals shared by all workers on this host; per-result usage is persisted by the frontend
+    if not run_id and not dataset:
+        raise HTTPException(status_code=400, detail="Provide run_id or dataset.")
+    response = {}
+    if run_id:
+        response["run"] = LEDGER.get("run", run_id)
+    if dataset:
+        response["dataset"] = LEDGER.get("dataset", dataset)
+    return response
+
+@app.get("/scheduler")
+def scheduler_stats():
+    # Slots of this worker process only
+    return SCHEDULER.stats()
+
+@app.get("/metrics")
+def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/prompt-variables")
 def get_prompt_variables(prompt_id: str = Query(...),
                           workspace: str = Query(...)):
-    key_mapping = {
-        "MaidsAT-Delighters-Doctors": "LANGSMITH_API_KEY_MAIDSAT",
-        "Resolvers": "LANGSMITH_API_KEY_RESOLVERS",
-        "Sales": "LANGSMITH_API_KEY_SALES"
-    }
-    selected_key = key_mapping.get(workspace)
-    api_key = os.getenv(selected_key)
+    api_key = resolve_api_key(workspace)
     if not api_key:
+        record_error("prompt_variables", "validation", workspace=workspace)
         raise HTTPException(status_code=400, detail="Invalid workspace.")
     try:
-        client = Client(api_key=api_key)
-        prompt = client.pull_prompt(prompt_id)
-
-        # Remove fields you handle internally
-        ignored = {"chat_history", "question"}
-        user_vars = sorted(var for var in prompt.input_variables if var not in ignored)
+        with STAGE_LATENCY.time(stage="prompt_pull", family="", workspace=workspace):
+            user_vars = prompt_variables(api_key, prompt_id)
 
         return {"variables": user_vars}
 
     except Exception as e:
+        record_error("prompt_variables", "rate_limit" if is_rate_limit_error(e) else "upstream", workspace=workspace)
         raise HTTPException(status_code=500, detail=f"Failed to extract variables: {str(e)}")
+
+@app.get("/prompt-commit")
+def get_prompt_commit(prompt_id: str = Query(...),
+                      workspace: str = Query(...)):
+    api_key = resolve_api_key(workspace)
+    if not api_key:
+        record_error("prompt_commit", "validation", workspace=workspace)
+        raise HTTPException(status_code=400, detail="Invalid workspace.")
+    try:
+        with STAGE_LATENCY.time(stage="prompt_pull", family="", workspace=workspace):
+            commit = resolve_prompt_commit(api_key, prompt_id)
+
+        return {"prompt_id": prompt_id, "commit": commit}
+
+    except Exception as e:
+        record_error("prompt_commit", "rate_limit" if is_rate_limit_error(e) else "upstream", workspace=workspace)
+        raise HTTPException(status_code=500, detail=f"Failed to resolve prompt commit: {str(e)}")
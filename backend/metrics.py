@@ -0,0 +1,186 @@
+# metrics.py – minimal Prometheus-style counters and histograms for the backend
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; tuned for LLM calls (sub-second to a couple of minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, math.inf)
+
+_REGISTRY = []
+
+
+def bounded_label(value, known):
+    """``value`` if it is one of ``known`` (or empty), else "unknown", so client input can't grow the series."""
+    if not value or value in known:
+        return value
+    return "unknown"
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for k, v in pairs:
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{k}="{v}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        _REGISTRY.append(self)
+
+    def _key(self, labels):
+        missing = set(self.labelnames) - set(labels)
+        unknown = set(labels) - set(self.labelnames)
+        if missing or unknown:
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) if labels[n] is not None else "" for n in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_items(items))
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_items(self, items):
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        buckets = tuple(sorted(buckets))
+        if buckets[-1] != math.inf:
+            buckets = buckets + (math.inf,)
+        self.buckets = buckets
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the ``with`` block, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_items(self, items):
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(state['sum'])}"
+            yield f"{self.name}_count{labels} {state['count']}"
+
+
+def render_metrics():
+    """Text exposition format (version 0.0.4) for every registered metric."""
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ------------------------------
+# 🔹 Backend metrics
+# ------------------------------
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests handled, by method, route and status code.",
+    ("method", "path", "status"),
+)
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "End-to-end HTTP request latency.",
+    ("method", "path"),
+)
+
+SIMULATION_ERRORS = Counter(
+    "simulation_errors_total",
+    "Failed requests by error class (validation, rate_limit, model, upstream, cancelled).",
+    ("endpoint", "error_class", "family", "workspace"),
+)
+
+# stage: key_resolution | prompt_pull | llm_construction | turn | summary | conversation | prompt_list
+STAGE_LATENCY = Histogram(
+    "simulation_stage_duration_seconds",
+    "Latency of individual simulation stages.",
+    ("stage", "family", "workspace"),
+)
+
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens reported by the model provider, by kind (prompt, completion, cache_read, cache_write).",
+    ("kind", "family", "workspace"),
+)
+
+COALESCED_REQUESTS = Counter(
+    "coalesced_requests_total",
+    "Requests served by joining an identical in-flight computation.",
+    ("endpoint",),
+)
+
+QUEUE_WAIT = Histogram(
+    "simulation_queue_wait_seconds",
+    "Time simulations waited for a scheduler slot, by priority class.",
+    ("priority", "workspace"),
+)
@@ -0,0 +1,64 @@
+# prompt_cache.py – provider-side prompt caching for the repeated system prompt + history prefix
+
+import re
+from functools import lru_cache
+from importlib import metadata
+
+# Families that need explicit breakpoints. OpenAI and Gemini cache long prefixes
+# automatically, so for them we only read the cached-token counts back.
+EXPLICIT_CACHE_FAMILIES = {"claude"}
+
+# Oldest integration that passes content blocks with cache_control through to
+# the API; older ones (e.g. the pinned langchain-anthropic 0.1.0) reject
+# non-string message content, so breakpoints are only added from this version on
+MIN_INTEGRATION_VERSIONS = {"claude": ("langchain-anthropic", (0, 3, 0))}
+
+# Price multipliers on the prompt-token rate: (cache write, cache read)
+CACHE_PRICE_MULTIPLIERS = {
+    "claude": (1.25, 0.10),
+    "openai": (1.00, 0.50),
+    "gemini": (1.00, 0.25),
+}
+
+
+def _parse_version(version):
+    # Leading digits of each release part: "0.3.0rc1" -> (0, 3, 0)
+    parts = []
+    for part in version.split(".")[:3]:
+        match = re.match(r"\d+", part)
+        parts.append(int(match.group()) if match else 0)
+    return tuple(parts)
+
+
+@lru_cache(maxsize=None)
+def _integration_supports_blocks(family):
+    package, minimum = MIN_INTEGRATION_VERSIONS[family]
+    try:
+        return _parse_version(metadata.version(package)) >= minimum
+    except metadata.PackageNotFoundError:
+        return False
+
+
+def supports_explicit_caching(family):
+    return family in EXPLICIT_CACHE_FAMILIES and _integration_supports_blocks(family)
+
+
+def mark_cache_breakpoint(chat_history):
+    """Return a copy of ``chat_history`` whose last message carries an Anthropic cache breakpoint.
+
+    Caching is prefix based: a breakpoint on the newest message caches the
+    system prompt plus every earlier message, and the next turn (which repeats
+    that prefix) reads it back through the provider's breakpoint look-back.
+    The caller's dicts are never mutated because the full history is returned
+    to the client as-is.
+    """
+    if not chat_history:
+        return chat_history
+    last = chat_history[-1]
+    content = last["content"]
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content}]
+    else:
+        blocks = [dict(b) for b in content]
+    blocks[-1]["cache_control"] = {"type": "ephemeral"}
+    return chat_history[:-1] + [{**last, "content": blocks}]
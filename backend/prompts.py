@@ -0,0 +1,111 @@
+# prompts.py – LangSmith prompt access through the shared cross-worker cache
+
+import hashlib
+import os
+import re
+
+from langsmith import Client
+
+from metrics import COALESCED_REQUESTS
+from shared_cache import CACHE
+from single_flight import SingleFlight
+
+# Only commits are immutable. A prompt referenced by name is cached under its latest
+# commit, looked up on every pull, so an edit in LangSmith is picked up by the next run;
+# movable tags ("name:prod", "name:latest") are never cached. Setting
+# PROMPT_CACHE_TTL_SECONDS to 0 turns the cache off (the prompt list uses it directly).
+PROMPT_CACHE_TTL_SECONDS = int(os.getenv("PROMPT_CACHE_TTL_SECONDS", "300"))
+PINNED_PROMPT_TTL_SECONDS = int(os.getenv("PINNED_PROMPT_TTL_SECONDS", str(24 * 3600)))
+
+_COMMIT_HASH = re.compile(r"[0-9a-f]{8,64}")
+
+# Inputs filled by the simulator itself, not by the user
+INTERNAL_VARIABLES = {"chat_history", "question"}
+
+
+# Concurrent misses for the same key (e.g. several sessions opening a workspace) share one fetch
+_flight = SingleFlight()
+
+
+def _cached(key, ttl, fetch, endpoint):
+    result, shared = _flight.do(key, lambda: CACHE.get_or_compute(key, ttl, fetch))
+    if shared:
+        COALESCED_REQUESTS.inc(endpoint=endpoint)
+    return result
+
+
+def _scope(api_key):
+    # Workspaces are identified by their key; never store the key itself
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def _commit_ref(prompt_id):
+    """The commit hash a ``name:ref`` id pins, or None for names and tags."""
+    if ":" not in prompt_id:
+        return None
+    ref = prompt_id.rsplit(":", 1)[1]
+    return ref if _COMMIT_HASH.fullmatch(ref) else None
+
+
+def _pull_pinned(api_key, prompt_id):
+    ttl = PINNED_PROMPT_TTL_SECONDS if PROMPT_CACHE_TTL_SECONDS > 0 else 0
+    return _cached(
+        f"prompt:{_scope(api_key)}:{prompt_id}",
+        ttl,
+        lambda: Client(api_key=api_key).pull_prompt(prompt_id),
+        "prompt_pull",
+    )
+
+
+def pull_prompt(api_key, prompt_id):
+    if _commit_ref(prompt_id) or PROMPT_CACHE_TTL_SECONDS <= 0:
+        return _pull_pinned(api_key, prompt_id)
+    client = Client(api_key=api_key)
+    if ":" not in prompt_id:
+        # One small metadata read instead of the full manifest; the commit it names is immutable
+        latest = getattr(client.get_prompt(prompt_id), "last_commit_hash", None)
+        if latest:
+            return _pull_pinned(api_key, f"{prompt_id}:{latest}")
+    # Tags move and unknown prompts should fail upstream: always pull fresh
+    return client.pull_prompt(prompt_id)
+
+
+def prompt_commit(prompt, prompt_id):
+    """Commit hash the pulled ``prompt`` came from, or None if LangSmith did not report one."""
+    commit = (getattr(prompt, "metadata", None) or {}).get("lc_hub_commit_hash")
+    return commit or _commit_ref(prompt_id)
+
+
+def resolve_prompt_commit(api_key, prompt_id):
+    # Same cached pull the simulator uses, so this is the version a run would get now
+    return prompt_commit(pull_prompt(api_key, prompt_id), prompt_id)
+
+
+def list_prompt_names(api_key):
+    def fetch():
+        client = Client(api_key=api_key)
+        offset = 0
+        limit = 100
+        prompt_names = []
+
+        while True:
+            response = client.list_prompts(limit=limit, offset=offset, is_public=False)
+
+            if not response.repos:
+                break
+
+            for id, p in response:
+                if id == "repos":
+                    for prompt in p:
+                        prompt_names.append(prompt.full_name)
+
+            offset += limit
+        return prompt_names
+
+    return _cached(f"prompt_list:{_scope(api_key)}", PROMPT_CACHE_TTL_SECONDS, fetch, "prompts")
+
+
+def prompt_variables(api_key, prompt_id):
+    # The pull is cached per commit, so this always reflects the version a run would get
+    prompt = pull_prompt(api_key, prompt_id)
+    return sorted(var for var in prompt.input_variables if var not in INTERNAL_VARIABLES)
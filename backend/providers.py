@@ -0,0 +1,81 @@
+# providers.py – lazily imported chat model families
+#
+# A family is only imported the first time a request uses it, so starting the
+# backend (or a benchmark/test) never pays for SDKs it does not touch.
+# Extra families can be plugged in without code changes through LLM_PROVIDERS:
+#
+#   LLM_PROVIDERS='{"mistral": {"target": "langchain_mistralai:ChatMistralAI",
+#                               "env": {"MISTRAL_API_KEY": "MISTRAL_API_KEY"}}}'
+
+import importlib
+import json
+import os
+import threading
+
+_lock = threading.Lock()
+_registry = {}
+_loaded = {}
+
+
+def register_provider(family, target, env=None, **kwargs):
+    """Register ``family`` as ``"module:Class"`` (imported on first use) or a ``factory(model=...)`` callable.
+
+    ``env`` maps the variable the SDK reads to the variable our .env defines.
+    ``kwargs`` are passed to the constructor alongside ``model``.
+    """
+    with _lock:
+        _registry[family] = {"target": target, "env": env or {}, "kwargs": kwargs}
+        _loaded.pop(family, None)
+
+
+def registered_families():
+    with _lock:
+        return sorted(_registry)
+
+
+def _resolve(family):
+    with _lock:
+        spec = _registry.get(family)
+        if spec is None:
+            raise ValueError(f"Unsupported model family: {family}")
+        factory = _loaded.get(family)
+        if factory is None:
+            target = spec["target"]
+            if callable(target):
+                factory = target
+            else:
+                module_name, _, attr = target.partition(":")
+                try:
+                    factory = getattr(importlib.import_module(module_name), attr)
+                except (ImportError, AttributeError) as e:
+                    raise ValueError(f"Model family '{family}' is not available: {e}")
+            _loaded[family] = factory
+        return factory, spec
+
+
+def build_llm(family, submodel):
+    factory, spec = _resolve(family)
+    # ✅ Set API keys via env vars only, NOT as constructor args
+    for sdk_var, source_var in spec["env"].items():
+        value = os.environ.get(source_var)
+        if value:
+            os.environ[sdk_var] = value
+    return factory(model=submodel, **spec["kwargs"])
+
+
+def load_provider_config(raw=None):
+    raw = raw if raw is not None else os.getenv("LLM_PROVIDERS", "")
+    if not raw.strip():
+        return
+    for family, spec in json.loads(raw).items():
+        register_provider(family, spec["target"], spec.get("env"), **spec.get("kwargs", {}))
+
+
+register_provider("claude", "langchain_anthropic:ChatAnthropic", {"ANTHROPIC_API_KEY": "ANTHROPIC_API_KEY"})
+register_provider("openai", "langchain_openai:ChatOpenAI", {"OPENAI_API_KEY": "OPENAI_API_KEY"})
+register_provider(
+    "gemini",
+    "langchain_google_genai:ChatGoogleGenerativeAI",
+    {"GOOGLE_API_KEY": "GEMINI_API_KEY"},
+    convert_system_message_to_human=True,
+)
@@ -0,0 +1,140 @@
+# scheduler.py – priority admission for simulations sharing the provider quota
+#
+# Every simulation waits for one of SIMULATION_SLOTS before it gets a worker
+# thread. Interactive runs (a single conversation checked from the UI) are
+# always admitted before batch runs (Run All), and batch runs can never take
+# the last INTERACTIVE_RESERVED_SLOTS, so a one-off check starts within a turn
+# or two however large the evaluation running next to it is. Within a class,
+# waiting workspaces take turns, with the one running the fewest simulations
+# served first, so one big dataset cannot starve another team's runs. A queued
+# simulation that an interactive request joins is promoted to interactive.
+#
+# Slots are per worker process; divide the provider quota accordingly.
+
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from metrics import QUEUE_WAIT
+
+# Highest priority first
+PRIORITIES = ("interactive", "batch")
+
+# Must stay below the threadpool size (40 by default) that runs the simulations
+SIMULATION_SLOTS = int(os.getenv("SIMULATION_SLOTS", "32"))
+INTERACTIVE_RESERVED_SLOTS = int(os.getenv("INTERACTIVE_RESERVED_SLOTS", "4"))
+
+
+class _Ticket:
+    def __init__(self, priority, tenant, key):
+        self.priority = priority
+        self.tenant = tenant
+        self.key = key
+        self.grant = asyncio.get_running_loop().create_future()
+
+
+class PriorityScheduler:
+    def __init__(self, slots=SIMULATION_SLOTS, reserved=INTERACTIVE_RESERVED_SLOTS):
+        self.slots = max(1, slots)
+        self.reserved = min(max(0, reserved), self.slots - 1)
+        self._running = {priority: 0 for priority in PRIORITIES}
+        self._running_by_tenant = {}
+        # priority -> tenant -> waiting tickets; tenant order is the round-robin order
+        self._waiting = {priority: OrderedDict() for priority in PRIORITIES}
+        self._queued = {}  # key -> waiting ticket, for promotion
+
+    @asynccontextmanager
+    async def slot(self, priority, tenant, key=None):
+        """Wait for a slot; ``key`` names the wait so ``promote`` can find it."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}'. Use one of: {', '.join(PRIORITIES)}.")
+        ticket = _Ticket(priority, tenant, key)
+        self._enqueue(ticket)
+        start = time.perf_counter()
+        self._dispatch()
+        try:
+            await ticket.grant
+        except asyncio.CancelledError:
+            if ticket.grant.done() and not ticket.grant.cancelled():
+                self._release(ticket.priority, tenant)  # admitted just as the caller went away
+            else:
+                self._forget(ticket)
+            raise
+        # The class it was admitted in, which differs from the requested one if it was promoted
+        QUEUE_WAIT.observe(time.perf_counter() - start, priority=ticket.priority, workspace=tenant)
+        try:
+            yield
+        finally:
+            self._release(ticket.priority, tenant)
+
+    def promote(self, key, priority):
+        """Move the queued wait named ``key`` up to ``priority``; no-op if it started or already ranks higher."""
+        ticket = self._queued.get(key)
+        if ticket is None or PRIORITIES.index(priority) >= PRIORITIES.index(ticket.priority):
+            return
+        self._forget(ticket)
+        ticket.priority = priority
+        self._enqueue(ticket)
+        self._dispatch()
+
+    def stats(self):
+        return {
+            "slots": self.slots,
+            "reserved_interactive": self.reserved,
+            "running": dict(self._running),
+            "waiting": {p: sum(len(q) for q in queues.values()) for p, queues in self._waiting.items()},
+        }
+
+    def _can_start(self, priority):
+        if sum(self._running.values()) >= self.slots:
+            return False
+        if priority == "batch":
+            return self._running["batch"] < self.slots - self.reserved
+        return True
+
+    def _dispatch(self):
+        for priority in PRIORITIES:
+            queues = self._waiting[priority]
+            while queues and self._can_start(priority):
+                tenant = min(queues, key=lambda t: self._running_by_tenant.get(t, 0))
+                waiting = queues[tenant]
+                ticket = waiting.popleft()
+                if waiting:
+                    queues.move_to_end(tenant)
+                else:
+                    del queues[tenant]
+                if self._queued.get(ticket.key) is ticket:
+                    del self._queued[ticket.key]
+                if ticket.grant.done():
+                    continue
+                ticket.grant.set_result(None)
+                self._running[priority] += 1
+                self._running_by_tenant[tenant] = self._running_by_tenant.get(tenant, 0) + 1
+
+    def _release(self, priority, tenant):
+        self._running[priority] -= 1
+        remaining = self._running_by_tenant.get(tenant, 0) - 1
+        if remaining > 0:
+            self._running_by_tenant[tenant] = remaining
+        else:
+            self._running_by_tenant.pop(tenant, None)
+        self._dispatch()
+
+    def _enqueue(self, ticket):
+        self._waiting[ticket.priority].setdefault(ticket.tenant, deque()).append(ticket)
+        if ticket.key is not None:
+            self._queued[ticket.key] = ticket
+
+    def _forget(self, ticket):
+        if self._queued.get(ticket.key) is ticket:
+            del self._queued[ticket.key]
+        waiting = self._waiting[ticket.priority].get(ticket.tenant)
+        if waiting and ticket in waiting:
+            waiting.remove(ticket)
+            if not waiting:
+                del self._waiting[ticket.priority][ticket.tenant]
+
+
+SCHEDULER = PriorityScheduler()
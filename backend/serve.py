@@ -0,0 +1,19 @@
+# serve.py – run the backend, optionally as several worker processes
+#
+#   BACKEND_WORKERS=4 python serve.py
+#
+# Workers share the LangSmith prompt cache, usage totals (shared_cache.py) and
+# simulation checkpoints (checkpoints.py) through SQLite files in this
+# directory, so they must run on the same host. /metrics stays per worker.
+
+import os
+
+import uvicorn
+
+if __name__ == "__main__":
+    uvicorn.run(
+        "main:app",
+        host=os.getenv("BACKEND_HOST", "0.0.0.0"),
+        port=int(os.getenv("BACKEND_PORT", "8000")),
+        workers=int(os.getenv("BACKEND_WORKERS", "1")),
+    )
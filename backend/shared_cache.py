@@ -0,0 +1,95 @@
+# shared_cache.py – key/value cache shared by every uvicorn worker on the host
+#
+# Backed by a local SQLite file in WAL mode, so separate worker processes see
+# each other's entries and upstream calls (LangSmith prompt pulls, prompt
+# listings) are made once per host instead of once per worker.
+# Values are pickled; the file must only be writable by the backend itself.
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", os.path.join(os.path.dirname(__file__), "shared_cache.sqlite3"))
+
+_MISSING = object()
+
+
+class SharedCache:
+    def __init__(self, path=SHARED_CACHE_PATH):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+
+    def _conn(self):
+        # One connection per thread and per process (workers fork after import)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key, default=None):
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            return default
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl):
+        try:
+            blob = pickle.dumps(value)
+        except Exception:
+            return False  # not picklable: callers simply recompute next time
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, blob, now + ttl),
+        )
+        conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+        return True
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def get_or_compute(self, key, ttl, compute):
+        """Cached value for ``key``, computing and storing it on a miss; ``ttl <= 0`` disables caching."""
+        if ttl <= 0:
+            return compute()
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value, ttl)
+        return value
+
+    def update(self, key, fn, ttl):
+        """Atomically replace the value with ``fn(current_or_None)`` across processes."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            current = pickle.loads(row[0]) if row and row[1] >= time.time() else None
+            value = fn(current)
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, pickle.dumps(value), time.time() + ttl),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+
+CACHE = SharedCache()
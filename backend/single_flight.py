@@ -0,0 +1,81 @@
+# single_flight.py – coalesce identical in-flight calls so one computation serves every caller
+
+import asyncio
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+
+
+def request_key(*parts):
+    """Stable hash of JSON-serializable request parts."""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """Thread-based: for sync code running in FastAPI's threadpool.
+
+    ``do`` returns ``(result, shared)``; ``shared`` is True for callers that
+    waited on someone else's call. Exceptions are re-raised in every caller.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = Future()
+                self._calls[key] = call
+        if not leader:
+            return call.result(), True
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class AsyncSingleFlight:
+    """Event-loop based: for ``async`` endpoints."""
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn):
+        while key in self._calls:
+            call = self._calls[key]
+            try:
+                # shield: a waiter going away must not cancel the shared call
+                return await asyncio.shield(call), True
+            except asyncio.CancelledError:
+                # The leader was cancelled but this caller was not: take over
+                if call.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+        call = asyncio.get_running_loop().create_future()
+        self._calls[key] = call
+        try:
+            result = await fn()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                call.cancel()
+            else:
+                call.set_exception(e)
+                call.exception()  # mark retrieved when nobody was waiting
+            raise
+        else:
+            call.set_result(result)
+            return result, False
+        finally:
+            self._calls.pop(key, None)
@@ -0,0 +1,153 @@
+# usage.py – token, latency and cost accounting for simulated turns
+
+from prompt_cache import CACHE_PRICE_MULTIPLIERS
+from shared_cache import CACHE
+
+# USD per 1M tokens (prompt, completion); list prices, update as providers change them
+MODEL_PRICING = {
+    "claude-3-haiku-20240307": (0.25, 1.25),
+    "claude-3-sonnet-20240229": (3.00, 15.00),
+    "claude-3-opus-20240229": (15.00, 75.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4": (30.00, 60.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "models/gemini-1.5-pro-latest": (3.50, 10.50),
+    "models/gemini-1.5-flash-latest": (0.35, 1.05),
+}
+
+
+def _first_int(mapping, *keys):
+    for key in keys:
+        value = mapping.get(key) if isinstance(mapping, dict) else getattr(mapping, key, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def extract_token_usage(message):
+    """Return ``(prompt_tokens, completion_tokens)`` from an AI message, or ``(None, None)``.
+
+    Newer langchain-core exposes ``usage_metadata``; older integrations only put
+    provider-specific counts in ``response_metadata``, so both are checked.
+    """
+    counts = extract_usage_counts(message)
+    return counts["prompt_tokens"], counts["completion_tokens"]
+
+
+def extract_usage_counts(message):
+    """Prompt, completion and prompt-cache token counts; ``prompt_tokens`` includes cached tokens."""
+    counts = {"prompt_tokens": None, "completion_tokens": None, "cache_read_tokens": None, "cache_write_tokens": None}
+
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        counts["prompt_tokens"] = _first_int(usage, "input_tokens")
+        counts["completion_tokens"] = _first_int(usage, "output_tokens")
+        details = (usage.get("input_token_details") or {}) if isinstance(usage, dict) else {}
+        counts["cache_read_tokens"] = _first_int(details, "cache_read")
+        counts["cache_write_tokens"] = _first_int(details, "cache_creation")
+        return counts
+
+    meta = getattr(message, "response_metadata", None) or {}
+    for key in ("usage", "token_usage", "usage_metadata"):
+        raw = meta.get(key)
+        if not raw:
+            continue
+        prompt = _first_int(raw, "input_tokens", "prompt_tokens", "prompt_token_count")
+        completion = _first_int(raw, "output_tokens", "completion_tokens", "candidates_token_count")
+        if prompt is None and completion is None:
+            continue
+        # Anthropic reports cache tokens separately from input_tokens
+        cache_write = _first_int(raw, "cache_creation_input_tokens")
+        cache_read = _first_int(raw, "cache_read_input_tokens")
+        if cache_read is not None or cache_write is not None:
+            prompt = (prompt or 0) + (cache_read or 0) + (cache_write or 0)
+        else:
+            # OpenAI and Gemini include cached tokens in the prompt count
+            details = (raw.get("prompt_tokens_details") or {}) if isinstance(raw, dict) else {}
+            cache_read = _first_int(details, "cached_tokens") or _first_int(raw, "cached_content_token_count")
+        counts.update(prompt_tokens=prompt, completion_tokens=completion,
+                      cache_read_tokens=cache_read, cache_write_tokens=cache_write)
+        return counts
+    return counts
+
+
+def estimate_cost(submodel, prompt_tokens, completion_tokens, family=None,
+                  cache_read_tokens=None, cache_write_tokens=None):
+    pricing = MODEL_PRICING.get(submodel)
+    if pricing is None or prompt_tokens is None or completion_tokens is None:
+        return None
+    read = cache_read_tokens or 0
+    write = cache_write_tokens or 0
+    write_mult, read_mult = CACHE_PRICE_MULTIPLIERS.get(family, (1.0, 1.0))
+    prompt_cost = (prompt_tokens - read - write) + write * write_mult + read * read_mult
+    return round((prompt_cost * pricing[0] + completion_tokens * pricing[1]) / 1_000_000, 6)
+
+
+def turn_usage(index, message, latency_s, submodel, family=None):
+    counts = extract_usage_counts(message)
+    return {
+        "turn": index,
+        **counts,
+        "latency_s": round(latency_s, 4),
+        "cost_usd": estimate_cost(submodel, counts["prompt_tokens"], counts["completion_tokens"], family,
+                                  counts["cache_read_tokens"], counts["cache_write_tokens"]),
+    }
+
+
+def _add(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a + b
+
+
+def summarize_usage(items):
+    """Aggregate turn or conversation usage dicts; unknown counts stay ``None``."""
+    total = {"prompt_tokens": None, "completion_tokens": None, "cache_read_tokens": None,
+             "cache_write_tokens": None, "latency_s": 0.0, "cost_usd": None}
+    for item in items:
+        for key in ("prompt_tokens", "completion_tokens", "cache_read_tokens", "cache_write_tokens", "cost_usd"):
+            total[key] = _add(total[key], item.get(key))
+        total["latency_s"] += item.get("latency_s") or 0.0
+    total["latency_s"] = round(total["latency_s"], 4)
+    if total["cost_usd"] is not None:
+        total["cost_usd"] = round(total["cost_usd"], 6)
+    total["total_tokens"] = _add(total["prompt_tokens"], total["completion_tokens"])
+    return total
+
+
+def conversation_usage(turns, overhead=()):
+    """Totals over ``turns`` plus any ``overhead`` calls (e.g. history summaries)."""
+    summary = summarize_usage(list(turns) + list(overhead))
+    summary["turns"] = turns
+    if overhead:
+        summary["overhead"] = list(overhead)
+    return summary
+
+
+class UsageLedger:
+    """Running totals per run and per dataset for the ``/usage`` API, shared across workers."""
+
+    def __init__(self, cache, ttl_seconds=7 * 24 * 3600):
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+
+    def record(self, usage, run_id=None, dataset=None):
+        flat = {k: v for k, v in usage.items() if k not in ("turns", "overhead")}
+        for scope, key in (("run", run_id), ("dataset", dataset)):
+            if not key:
+                continue
+
+            def merge(current):
+                merged = summarize_usage([current, flat] if current else [flat])
+                merged["conversations"] = (current or {}).get("conversations", 0) + 1
+                return merged
+
+            self.cache.update(f"usage:{scope}:{key}", merge, self.ttl_seconds)
+
+    def get(self, scope, key):
+        return self.cache.get(f"usage:{scope}:{key}")
+
+
+LEDGER = UsageLedger(CACHE)
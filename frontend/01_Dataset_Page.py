@@ -2,11 +2,11 @@
 
 import streamlit as st
 from data_store import (
-    load_dataset_names,
+    load_catalog,
+    rebuild_catalog,
     create_dataset,
     delete_dataset,
     rename_dataset,
-    load_conversations,
 )
 import math
 
@@ -21,7 +21,6 @@ def confirm_delete(name: str) -> None:
     delete_dataset(name)
     st.session_state.update({          # mark UI state
         "deleting_dataset": None,
-        "dataset_convo_counts": {},    # force fresh counts next run
     })
     # toast instead of banner (avoids pushing content to the top)
     st.toast(f"Deleted '{name}' dataset", icon="🗑️")
@@ -35,7 +34,7 @@ with hdr[0]:
 
 with hdr[1]:
     def refresh_list() -> None:
-        st.session_state.dataset_convo_counts.clear()   # drop cache
+        rebuild_catalog()   # recount in case datasets were changed outside this app
         # No st.rerun() here – Streamlit will rerun automatically.
 
     st.button("⟳", key="refresh_button", on_click=refresh_list)
@@ -56,7 +55,6 @@ for key, default in {
     "editing_dataset": None,
     "deleting_dataset": None,
     "creating_dataset": False,
-    "dataset_convo_counts": {},
 }.items():
     if key not in st.session_state:
         st.session_state[key] = default
@@ -69,6 +67,9 @@ if "pending_toast" in st.session_state:
     del st.session_state.pending_toast
 
 
+# --- One catalog read per run: names, counts and last-modified times ---
+catalog = load_catalog()
+
 # --- Create Dataset Modal ---
 if st.session_state.creating_dataset:
     st.markdown("---")
@@ -79,13 +80,12 @@ if st.session_state.creating_dataset:
             try:
                 if new_name.strip() == "":
                     st.warning("Name cannot be empty.")
-                elif new_name.strip() in load_dataset_names():
+                elif new_name.strip() in catalog:
                     st.warning("A dataset with this name already exists.")
                 else:
                     create_dataset(new_name.strip())
                     st.toast(f"Created dataset “{new_name.strip()}”", icon="📁")
                     st.session_state.creating_dataset = False
-                    st.session_state.dataset_convo_counts.clear()
                     st.rerun()
             except Exception as e:
                 st.error(f"Error creating dataset: {e}")
@@ -96,21 +96,24 @@ if st.session_state.creating_dataset:
         )
 
 # --- Load Dataset Names & Filter ---
-dataset_names = load_dataset_names()
+dataset_names = list(catalog)
 if search_query:
     dataset_names = [d for d in dataset_names if search_query.lower() in d.lower()]
 
-# --- Count conversations only when idle ---
-if not st.session_state.creating_dataset and not st.session_state.editing_dataset and not st.session_state.deleting_dataset:
-    for name in dataset_names:
-        if name not in st.session_state.dataset_convo_counts:
-            try:
-                st.session_state.dataset_convo_counts[name] = len(load_conversations(name))
-            except Exception:
-                st.session_state.dataset_convo_counts[name] = 0
+def format_last_modified(value) -> str:
+    # Firestore returns timestamps as datetimes; pending server timestamps may be missing
+    return value.strftime("%Y-%m-%d %H:%M") if hasattr(value, "strftime") else "—"
 
 # --- Prepare Display Objects ---
-dataset_objs = [{"name": name, "num_conversations": st.session_state.dataset_convo_counts.get(name, 0)} for name in dataset_names]
+dataset_objs = [
+    {
+        "name": name,
+        "num_conversations": catalog[name].get("conversations", 0),
+        "num_results": catalog[name].get("results", 0),
+        "last_modified": format_last_modified(catalog[name].get("last_modified")),
+    }
+    for name in dataset_names
+]
 dataset_objs.sort(key=lambda d: d["name"].lower())
 
 # --- Pagination Logic ---
@@ -120,14 +123,16 @@ current_page = st.session_state.dataset_page
 start = (current_page - 1) * datasets_per_page
 end = start + datasets_per_page
 visible_datasets = dataset_objs[start:end]
-table_cols = [4, 2, 2, 2]
+table_cols = [4, 2, 2, 3, 2, 2]
 # --- Table Header ---
 st.markdown("### ")
 header_cols = st.columns(table_cols)
 header_cols[0].markdown("**Name**")
 header_cols[1].markdown("**Convos**")
-header_cols[2].markdown("**Edit**")
-header_cols[3].markdown("**Delete**")
+header_cols[2].markdown("**Results**")
+header_cols[3].markdown("**Updated**")
+header_cols[4].markdown("**Edit**")
+header_cols[5].markdown("**Delete**")
 
 # --- Dataset Rows ---
 for ds in visible_datasets:
@@ -142,7 +147,7 @@ for ds in visible_datasets:
                 try:
                     if new_name.strip() == "":
                         st.warning("New name cannot be empty.")
-                    elif new_name.strip() in load_dataset_names():
+                    elif new_name.strip() in catalog:
                         st.warning("That name already exists.")
                     else:
                         rename_dataset(ds["name"], new_name.strip())
@@ -174,6 +179,12 @@ for ds in visible_datasets:
         st.markdown(f"{ds['num_conversations']}")
 
     with row_cols[2]:
+        st.markdown(f"{ds['num_results']}")
+
+    with row_cols[3]:
+        st.markdown(ds["last_modified"])
+
+    with row_cols[4]:
        st.button(
         "✏️",
         key=f"edit_{ds['name']}",
@@ -183,7 +194,7 @@ for ds in visible_datasets:
         args=(ds["name"],))
 
     # … your delete button …
-    with row_cols[3]:
+    with row_cols[5]:
         # toggle open/close
         st.button(
             "🗑️",
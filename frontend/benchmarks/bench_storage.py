@@ -0,0 +1,304 @@
+# benchmarks/bench_storage.py – scaling benchmark for the Firestore data_store operations
+#
+# Run from the frontend directory:
+#   python -m benchmarks.bench_storage --conversations 100,1000 --results 0,5,20
+#
+# By default data_store is pointed at the in-memory stand-in from
+# benchmarks/firestore_standin.py. With --backend emulator it talks to the
+# Firestore emulator instead (FIRESTORE_EMULATOR_HOST must be set; the
+# emulator's data is wiped between scenarios, so never point it at a real project).
+#
+# Each operation is timed over --repeats runs on a freshly populated dataset
+# where it changes the data, plus one extra run under tracemalloc for peak
+# memory. Reads, writes and bytes are estimated from the documents moved
+# (Firestore storage-size rules), not measured on the wire.
+
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+import tracemalloc
+import urllib.request
+import uuid
+
+import data_store
+from benchmarks.firestore_standin import Meter, document_size, install
+from result_format import compact_results
+
+DATASET = "bench-dataset"
+OPERATIONS = ("load_conversations", "save_single_conversation", "delete_dataset", "rename_dataset")
+_WORDS = (
+    "order refund delivery account payment invoice agent customer issue please thanks update status "
+    "booking cancel change address visa contract salary schedule request confirm document pending "
+    "approved rejected today tomorrow week month help question answer follow support team"
+).split()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# ------------------------------
+# 🔹 Synthetic datasets
+# ------------------------------
+def _text(rng, chars):
+    words = []
+    length = 0
+    while length < chars:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:chars]
+
+
+def make_result(rng, content, message_chars):
+    output = []
+    turns = []
+    for msg in content:
+        if msg["role"] == "human":
+            output.append(msg)
+            output.append({"role": "ai", "content": _text(rng, message_chars)})
+            turns.append({"index": len(turns), "prompt_tokens": rng.randint(500, 4000),
+                          "completion_tokens": rng.randint(20, 300), "latency_s": round(rng.uniform(0.5, 4), 3),
+                          "cost_usd": round(rng.uniform(0.0001, 0.01), 6)})
+    usage = {"prompt_tokens": sum(t["prompt_tokens"] for t in turns),
+             "completion_tokens": sum(t["completion_tokens"] for t in turns),
+             "latency_s": round(sum(t["latency_s"] for t in turns), 3),
+             "cost_usd": round(sum(t["cost_usd"] for t in turns), 6), "turns": turns}
+    return {
+        "time": "2025-01-01 10:00",
+        "prompt_id": "bench/prompt",
+        "model": "claude:claude-3-haiku-20240307",
+        "variables": {"agent_name": "Bench"},
+        "output": output,
+        "usage": usage,
+        "history": {"strategy": "full", "limit": None},
+        "run_id": uuid.UUID(int=rng.getrandbits(128)).hex,
+        "prompt_commit": "%012x" % rng.getrandbits(48),
+        "fingerprint": "%064x" % rng.getrandbits(256),
+    }
+
+
+def make_conversation(rng, index, turns, results, message_chars):
+    content = []
+    for _ in range(turns):
+        content.append({"role": "human", "content": _text(rng, message_chars)})
+        content.append({"role": "ai", "content": _text(rng, message_chars)})
+    return {
+        "conversation_id": f"chat-{index:06d}",
+        "username": f"user-{index % 50}",
+        "date_of_report": f"2025-{1 + index % 12:02d}-{1 + index % 28:02d}T10:00:00Z",
+        "content": content,
+        "results": [make_result(rng, content, message_chars) for _ in range(results)],
+    }
+
+
+def make_dataset(size, turns, results, message_chars, seed):
+    rng = random.Random(seed)
+    return [make_conversation(rng, i, turns, results, message_chars) for i in range(size)]
+
+
+def populate(client, dataset_name, conversations):
+    """Write the dataset the way the app stores it, in batches and outside any measurement."""
+    batch = client.batch()
+    for i, convo in enumerate(conversations, start=1):
+        batch.set(data_store._conversation_ref(dataset_name, convo["conversation_id"]),
+                  {**convo, "results": compact_results(convo), "result_count": len(convo["results"])})
+        if i % 400 == 0:
+            batch.commit()
+            batch = client.batch()
+    batch.set(client.collection(data_store.ROOT_COLLECTION).document(dataset_name), {})
+    batch.set(data_store._catalog_ref(), {"datasets": {dataset_name: data_store._catalog_delta(
+        len(conversations), sum(len(c["results"]) for c in conversations)
+    )}}, merge=True)
+    batch.commit()
+
+
+# ------------------------------
+# 🔹 Storage backends
+# ------------------------------
+def open_memory(meter):
+    client = install(data_store, meter)
+    return client, client.clear
+
+
+def open_emulator(meter, project):
+    host = os.getenv("FIRESTORE_EMULATOR_HOST")
+    if not host:
+        raise SystemExit("Set FIRESTORE_EMULATOR_HOST (e.g. localhost:8080) to benchmark against the emulator.")
+    from google.auth.credentials import AnonymousCredentials
+    from google.cloud import firestore
+
+    _instrument_client_library(meter)
+    client = firestore.Client(project=project, credentials=AnonymousCredentials())
+    data_store._db = client
+
+    def clear():
+        url = f"http://{host}/emulator/v1/projects/{project}/databases/(default)/documents"
+        urllib.request.urlopen(urllib.request.Request(url, method="DELETE")).close()
+
+    return client, clear
+
+
+def _instrument_client_library(meter):
+    # Counts what the real client library deserializes and serializes
+    from google.cloud.firestore_v1 import base_batch, base_document, document
+
+    to_dict = base_document.DocumentSnapshot.to_dict
+    batch_set = base_batch.BaseWriteBatch.set
+    batch_delete = base_batch.BaseWriteBatch.delete
+    document_delete = document.DocumentReference.delete
+
+    def metered_to_dict(self):
+        data = to_dict(self)
+        meter.add(reads=1, bytes_read=document_size(self.reference.path, data) if data is not None else 0)
+        return data
+
+    def metered_set(self, reference, document_data, *args, **kwargs):
+        meter.add(writes=1, bytes_written=document_size(reference.path, document_data))
+        return batch_set(self, reference, document_data, *args, **kwargs)
+
+    def metered_batch_delete(self, reference, *args, **kwargs):
+        meter.add(deletes=1)
+        return batch_delete(self, reference, *args, **kwargs)
+
+    def metered_delete(self, *args, **kwargs):
+        meter.add(deletes=1)
+        return document_delete(self, *args, **kwargs)
+
+    base_document.DocumentSnapshot.to_dict = metered_to_dict
+    base_batch.BaseWriteBatch.set = metered_set
+    base_batch.BaseWriteBatch.delete = metered_batch_delete
+    document.DocumentReference.delete = metered_delete
+
+
+# ------------------------------
+# 🔹 Scenarios
+# ------------------------------
+def prepare(operation, client, clear, conversations, repetition, rng, message_chars, state):
+    """Set up one repetition outside the measurement; returns the call to measure."""
+    fresh = operation in ("delete_dataset", "rename_dataset")
+    if fresh or not state.get("populated"):
+        clear()
+        populate(client, DATASET, conversations)
+        state["populated"] = True
+        if operation == "save_single_conversation":
+            # As in the Chat page: stored (compact) results plus one new full result
+            state["loaded"] = data_store.load_conversations(DATASET)
+
+    if operation == "load_conversations":
+        return lambda: data_store.load_conversations(DATASET)
+    if operation == "save_single_conversation":
+        convo = state["loaded"][repetition % len(state["loaded"])]
+        convo["results"].append(make_result(rng, convo["content"], message_chars))
+        return lambda: data_store.save_single_conversation(convo, DATASET)
+    if operation == "delete_dataset":
+        return lambda: data_store.delete_dataset(DATASET)
+    if operation == "rename_dataset":
+        return lambda: data_store.rename_dataset(DATASET, DATASET + "-renamed")
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+def run_scenario(operation, client, clear, meter, size, turns, results, message_chars, repeats, seed):
+    conversations = make_dataset(size, turns, results, message_chars, seed)
+    rng = random.Random(seed + 1)
+    state = {}
+    latencies = []
+    counts = {}
+    peak_bytes = 0
+
+    # The last repetition only measures memory; tracemalloc slows everything down
+    for repetition in range(repeats + 1):
+        call = prepare(operation, client, clear, conversations, repetition, rng, message_chars, state)
+        meter.reset()
+        if repetition == repeats:
+            tracemalloc.start()
+            call()
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            start = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - start)
+            counts = meter.snapshot()
+
+    return {
+        "operation": operation,
+        "conversations": size,
+        "results_per_conversation": results,
+        "turns": turns,
+        "repeats": repeats,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        **counts,
+        "peak_memory_bytes": peak_bytes,
+    }
+
+
+def print_table(rows):
+    header = ["operation", "convos", "results", "p50 ms", "p95 ms", "reads", "writes", "deletes",
+              "KB read", "KB written", "peak MB"]
+    print(" | ".join(header))
+    for r in rows:
+        print(" | ".join(str(v) for v in [
+            r["operation"], r["conversations"], r["results_per_conversation"], r["p50_ms"], r["p95_ms"],
+            r["reads"], r["writes"], r["deletes"], round(r["bytes_read"] / 1024, 1),
+            round(r["bytes_written"] / 1024, 1), round(r["peak_memory_bytes"] / 2**20, 2),
+        ]))
+
+
+def parse_int_list(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def parse_operations(value):
+    operations = [v.strip() for v in value.split(",") if v.strip()]
+    unknown = set(operations) - set(OPERATIONS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown operation(s): {', '.join(sorted(unknown))}")
+    return operations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark data_store operations against synthetic datasets.")
+    parser.add_argument("--backend", choices=["memory", "emulator"], default="memory")
+    parser.add_argument("--project", default="bench-evaluation-simulation", help="Emulator project id")
+    parser.add_argument("--operations", type=parse_operations, default=list(OPERATIONS))
+    parser.add_argument("--conversations", type=parse_int_list, default=[100, 1000], help="Dataset sizes")
+    parser.add_argument("--results", type=parse_int_list, default=[0, 5, 20], help="Results per conversation")
+    parser.add_argument("--turns", type=int, default=10, help="Human turns per conversation")
+    parser.add_argument("--message-chars", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--json", dest="json_out", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    meter = Meter()
+    if args.backend == "emulator":
+        client, clear = open_emulator(meter, args.project)
+    else:
+        client, clear = open_memory(meter)
+
+    rows = []
+    for size in args.conversations:
+        for results in args.results:
+            for operation in args.operations:
+                rows.append(run_scenario(operation, client, clear, meter, size, args.turns, results,
+                                         args.message_chars, args.repeats, args.seed))
+    clear()
+
+    print_table(rows)
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+# benchmarks/firestore_standin.py – in-memory Firestore stand-in and byte/op metering
+#
+# Implements the slice of the firebase_admin Firestore API that data_store.py
+# uses, so the storage benchmark runs without credentials or an emulator.
+# Documents are kept pickled, like the serialized documents the real client
+# sends and receives, and every read, write and delete is counted along with
+# the estimated Firestore size of the data moved.
+
+import copy
+import pickle
+import sys
+import threading
+import types
+from datetime import datetime, timezone
+
+
+# ------------------------------
+# 🔹 Size estimate (Firestore storage size rules, which track wire size closely)
+# ------------------------------
+def value_size(value):
+    if isinstance(value, str):
+        return len(value.encode("utf-8")) + 1
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float, datetime)):
+        return 8
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(k).encode("utf-8")) + 1 + value_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(value_size(v) for v in value)
+    return 8  # transforms such as Increment / SERVER_TIMESTAMP
+
+
+def document_size(path, data):
+    name = sum(len(segment.encode("utf-8")) + 1 for segment in path.split("/")) + 16
+    return name + value_size(data or {}) + 32
+
+
+class Meter:
+    """Operation and byte counters, shared by the stand-in and the emulator instrumentation."""
+
+    FIELDS = ("reads", "writes", "deletes", "bytes_read", "bytes_written")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, **amounts):
+        with self._lock:
+            for key, amount in amounts.items():
+                self.counts[key] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+
+# ------------------------------
+# 🔹 Sentinels and transforms (stand-ins for firebase_admin.firestore's)
+# ------------------------------
+class _Sentinel:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+SERVER_TIMESTAMP = _Sentinel("SERVER_TIMESTAMP")
+DELETE_FIELD = _Sentinel("DELETE_FIELD")
+
+
+class Increment:
+    def __init__(self, value):
+        self.value = value
+
+
+def _resolve(value, current=None):
+    if value is SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    if isinstance(value, Increment):
+        return (current if isinstance(current, (int, float)) else 0) + value.value
+    if isinstance(value, dict):
+        return {k: _resolve(v) for k, v in value.items() if v is not DELETE_FIELD}
+    return value
+
+
+def _merge(current, updates):
+    merged = dict(current)
+    for key, value in updates.items():
+        if value is DELETE_FIELD:
+            merged.pop(key, None)
+        elif isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = _resolve(value, merged.get(key))
+    return merged
+
+
+def _mask(data, field_paths):
+    if field_paths is None:
+        return data
+    return {k: data[k] for k in field_paths if k in data}
+
+
+# ------------------------------
+# 🔹 Client, references and snapshots
+# ------------------------------
+class InMemoryFirestore:
+    def __init__(self, meter=None):
+        self.meter = meter or Meter()
+        self._docs = {}  # document path -> pickled data
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+
+    def collection(self, path):
+        return CollectionReference(self, path)
+
+    def transaction(self):
+        return WriteBatch(self)
+
+    def batch(self):
+        return WriteBatch(self)
+
+    # Storage primitives used by the references
+    def _read(self, path, field_paths=None):
+        with self._lock:
+            blob = self._docs.get(path)
+        if blob is None:
+            self.meter.add(reads=1)
+            return None
+        data = _mask(pickle.loads(blob), field_paths)
+        self.meter.add(reads=1, bytes_read=document_size(path, data))
+        return data
+
+    def _write(self, path, data, merge=False):
+        self.meter.add(writes=1, bytes_written=document_size(path, data))
+        with self._lock:
+            current = pickle.loads(self._docs[path]) if merge and path in self._docs else {}
+            stored = _merge(current, data) if merge else _resolve(data)
+            self._docs[path] = pickle.dumps(stored, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _delete(self, path):
+        self.meter.add(deletes=1)
+        with self._lock:
+            self._docs.pop(path, None)
+
+    def _children(self, collection_path):
+        """Ids of documents in ``collection_path``, including missing ones that have subcollections."""
+        prefix = collection_path + "/"
+        with self._lock:
+            paths = list(self._docs)
+        ids = {}
+        for path in paths:
+            if path.startswith(prefix):
+                ids[path[len(prefix):].split("/", 1)[0]] = None
+        return list(ids)
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return self._data
+
+
+class DocumentReference:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name):
+        return CollectionReference(self._client, f"{self.path}/{name}")
+
+    def get(self, field_paths=None, transaction=None):
+        return DocumentSnapshot(self, self._client._read(self.path, field_paths))
+
+    def set(self, data, merge=False):
+        self._client._write(self.path, data, merge)
+
+    def delete(self):
+        self._client._delete(self.path)
+
+
+class CollectionReference:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, document_id):
+        return DocumentReference(self._client, f"{self.path}/{document_id}")
+
+    def list_documents(self):
+        refs = [self.document(doc_id) for doc_id in self._client._children(self.path)]
+        self._client.meter.add(reads=len(refs))
+        return refs
+
+    def select(self, field_paths):
+        return _Query(self, list(field_paths))
+
+    def stream(self):
+        return _Query(self, None).stream()
+
+
+class _Query:
+    def __init__(self, collection, field_paths):
+        self._collection = collection
+        self._field_paths = field_paths
+
+    def stream(self):
+        client = self._collection._client
+        for doc_id in client._children(self._collection.path):
+            ref = self._collection.document(doc_id)
+            data = client._read(ref.path, self._field_paths)
+            if data is not None:
+                yield DocumentSnapshot(ref, data)
+
+
+class WriteBatch:
+    """Batches and transactions alike: writes are buffered and applied on commit."""
+
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, data, merge=False):
+        self._writes.append((reference.path, copy.deepcopy(data), merge))
+
+    def delete(self, reference):
+        self._writes.append((reference.path, None, None))
+
+    def commit(self):
+        writes, self._writes = self._writes, []
+        for path, data, merge in writes:
+            if merge is None:
+                self._client._delete(path)
+            else:
+                self._client._write(path, data, merge)
+
+
+def transactional(fn):
+    def run(transaction, *args, **kwargs):
+        result = fn(transaction, *args, **kwargs)
+        transaction.commit()
+        return result
+    return run
+
+
+# ------------------------------
+# 🔹 Install in place of firebase_admin
+# ------------------------------
+def install(data_store, meter=None):
+    """Point ``data_store`` at a fresh in-memory client; returns the client."""
+    client = InMemoryFirestore(meter)
+    firestore = types.ModuleType("firebase_admin.firestore")
+    firestore.Increment = Increment
+    firestore.SERVER_TIMESTAMP = SERVER_TIMESTAMP
+    firestore.DELETE_FIELD = DELETE_FIELD
+    firestore.transactional = transactional
+    firestore.client = lambda: client
+    firebase_admin = types.ModuleType("firebase_admin")
+    firebase_admin.firestore = firestore
+    firebase_admin._apps = {"[DEFAULT]": None}
+    sys.modules["firebase_admin"] = firebase_admin
+    sys.modules["firebase_admin.firestore"] = firestore
+    data_store._db = client
+    return client
@@ -0,0 +1,59 @@
+# conversation_index.py – precomputed lookup structures for the Chat Page filters
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+
+def parse_report_date(value):
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except Exception:
+        return None
+
+
+class ConversationIndex:
+    """Built once per conversation load and reused on every rerun.
+
+    Conversations whose ``date_of_report`` cannot be parsed are never listed,
+    matching the behaviour of the original per-row filter.
+    """
+
+    def __init__(self, conversations):
+        self.conversations = conversations
+        self.datetimes = [parse_report_date(c.get("date_of_report", "")) for c in conversations]
+        self.valid = [pos for pos, dt in enumerate(self.datetimes) if dt is not None]
+
+        by_date = sorted(self.valid, key=lambda pos: self.datetimes[pos].date())
+        self._sorted_dates = [self.datetimes[pos].date() for pos in by_date]
+        self._date_positions = by_date
+
+        # Lowercased once; a scan over prepared strings beats any Python-level
+        # n-gram index at this size, at a fraction of its memory
+        self._users = [c.get("username", "").lower() for c in conversations]
+        self._ids = [c.get("conversation_id", "").lower() for c in conversations]
+        self._formatted = {}
+
+    def matches(self, conversations):
+        # Same list object and length means nothing was reloaded, added or removed
+        return conversations is self.conversations and len(conversations) == len(self.datetimes)
+
+    def filter(self, start_date=None, end_date=None, user="", chat_id=""):
+        """Conversations matching all filters, in their original (newest first) order."""
+        positions = self.valid
+        if start_date or end_date:
+            lo = bisect_left(self._sorted_dates, start_date) if start_date else 0
+            hi = bisect_right(self._sorted_dates, end_date) if end_date else len(self._sorted_dates)
+            positions = sorted(self._date_positions[lo:hi])
+        for keys, query in ((self._users, user), (self._ids, chat_id)):
+            if query.strip():
+                query = query.lower()
+                positions = [pos for pos in positions if query in keys[pos]]
+        return [self.conversations[pos] for pos in positions]
+
+    def local_time(self, convo, tz, fmt="%b %d, %Y - %I:%M %p"):
+        """``date_of_report`` formatted in ``tz``, memoized per conversation and timezone."""
+        key = (convo.get("conversation_id"), str(tz))
+        if key not in self._formatted:
+            dt = parse_report_date(convo.get("date_of_report", ""))
+            self._formatted[key] = dt.astimezone(tz).strftime(fmt) if dt else convo.get("date_of_report", "")
+        return self._formatted[key]
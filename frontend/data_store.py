@@ -1,26 +1,103 @@
 # data_store.py using Firestore with dataset support
 
-import firebase_admin
-from firebase_admin import credentials, firestore
 import json
 import os
+import threading
 from io import StringIO
 
+from result_format import compact_results
+from dataset_cache import DatasetCache
+
 FIREBASE_CREDENTIALS_JSON = os.getenv("FIREBASE_CREDENTIALS_JSON")
+ROOT_COLLECTION = "chat_reports"
 
-if not firebase_admin._apps:
-    cred = credentials.Certificate(json.load(StringIO(FIREBASE_CREDENTIALS_JSON)))
-    firebase_admin.initialize_app(cred)
+# Single document listing every dataset with its counts; kept outside
+# ROOT_COLLECTION so it is never mistaken for a dataset
+CATALOG_COLLECTION = "dataset_catalog"
+CATALOG_DOCUMENT = "index"
 
-db = firestore.client()
-ROOT_COLLECTION = "chat_reports"
+_db = None
+_db_lock = threading.Lock()
+
+# ------------------------------
+# 🔹 Lazy Firestore client (firebase_admin is imported and initialized on first use)
+# ------------------------------
+def get_db():
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                import firebase_admin
+                from firebase_admin import credentials, firestore
+
+                if not firebase_admin._apps:
+                    cred = credentials.Certificate(json.load(StringIO(FIREBASE_CREDENTIALS_JSON)))
+                    firebase_admin.initialize_app(cred)
+                _db = firestore.client()
+    return _db
+
+# ------------------------------
+# 🔹 Dataset catalog: {"datasets": {name: {conversations, results, last_modified}}}
+# ------------------------------
+def _catalog_ref():
+    return get_db().collection(CATALOG_COLLECTION).document(CATALOG_DOCUMENT)
+
+def _conversation_ref(dataset_name, conversation_id):
+    return get_db().collection(ROOT_COLLECTION).document(dataset_name).collection("conversations").document(conversation_id)
+
+def _catalog_delta(conversations=0, results=0):
+    from firebase_admin import firestore
+    return {
+        "conversations": firestore.Increment(conversations),
+        "results": firestore.Increment(results),
+        "last_modified": firestore.SERVER_TIMESTAMP,
+    }
+
+def _stored_result_count(doc_ref, transaction):
+    # None if the conversation does not exist yet; masked reads avoid pulling every result
+    snapshot = doc_ref.get(field_paths=["result_count"], transaction=transaction)
+    if not snapshot.exists:
+        return None
+    count = (snapshot.to_dict() or {}).get("result_count")
+    if count is None:  # written before the catalog existed
+        snapshot = doc_ref.get(field_paths=["results"], transaction=transaction)
+        count = len((snapshot.to_dict() or {}).get("results", []))
+    return count
+
+def rebuild_catalog():
+    """Recount every dataset from scratch; used on first run and by the dataset page refresh."""
+    from firebase_admin import firestore
+    datasets = {}
+    for dataset_ref in get_db().collection(ROOT_COLLECTION).list_documents():
+        conversations = 0
+        results = 0
+        for doc in dataset_ref.collection("conversations").select(["result_count"]).stream():
+            conversations += 1
+            count = (doc.to_dict() or {}).get("result_count")
+            if count is None:  # written before the catalog existed
+                snapshot = doc.reference.get(field_paths=["results"])
+                count = len((snapshot.to_dict() or {}).get("results", []))
+            results += count
+        datasets[dataset_ref.id] = {
+            "conversations": conversations,
+            "results": results,
+            "last_modified": firestore.SERVER_TIMESTAMP,
+        }
+    _catalog_ref().set({"datasets": datasets})
+    return load_catalog()
+
+def load_catalog():
+    """{name: {"conversations", "results", "last_modified"}} for every dataset, in one read."""
+    snapshot = _catalog_ref().get()
+    if not snapshot.exists:
+        return rebuild_catalog()
+    return (snapshot.to_dict() or {}).get("datasets", {})
 
 # ------------------------------
-# 🔹 New: Load available dataset names  
+# 🔹 Load available dataset names (from the catalog)
 # ------------------------------
 def load_dataset_names():
-    collections = db.collection(ROOT_COLLECTION).list_documents()
-    return [doc.id for doc in collections]
+    return sorted(load_catalog())
 
 # ------------------------------
 # 🔹 Load conversations from a specific dataset
@@ -30,28 +107,62 @@ def load_conversations(dataset_name):
         return []
 
     conv_path = f"{ROOT_COLLECTION}/{dataset_name}/conversations"
-    docs = db.collection(conv_path).stream()
+    docs = get_db().collection(conv_path).stream()
 
     conversations = []
     for doc in docs:
         data = doc.to_dict()
         conversations.append(data)
 
-    conversations.sort(key=lambda c: c.get("date_of_report", ""), reverse=True)
+    conversations.sort(key=_report_order, reverse=True)
     return conversations
 
+def _report_order(convo):
+    return convo.get("date_of_report", "")
+
+# ------------------------------
+# 🔹 Process-wide dataset cache shared by all sessions (see dataset_cache.py);
+#    the writes below keep it current
+# ------------------------------
+DATASETS = DatasetCache(load_conversations, sort_key=_report_order)
+
+def open_dataset(dataset_name):
+    """Lease on the shared copy of ``dataset_name``; read ``lease.conversations`` on every rerun."""
+    return DATASETS.acquire(dataset_name)
+
 # ------------------------------
 # 🔹 Save single conversation to a dataset
 # ------------------------------
+def _write_conversation(convo, dataset_name):
+    """Write the conversation and adjust the catalog counts in one transaction."""
+    from firebase_admin import firestore
+    doc_ref = _conversation_ref(dataset_name, convo["conversation_id"])
+    catalog_ref = _catalog_ref()
+    result_count = len(convo.get("results", []))
+
+    @firestore.transactional
+    def write(transaction):
+        previous = _stored_result_count(doc_ref, transaction)
+        transaction.set(doc_ref, {**convo, "results": compact_results(convo), "result_count": result_count})
+        delta = _catalog_delta(
+            conversations=0 if previous is not None else 1,
+            results=result_count - (previous or 0),
+        )
+        transaction.set(catalog_ref, {"datasets": {dataset_name: delta}}, merge=True)
+
+    write(get_db().transaction())
+    DATASETS.conversation_saved(dataset_name, convo)
+
 def save_single_conversation(convo, dataset_name):
     if not dataset_name:
         raise ValueError("dataset_name is required to save conversation")
 
     try:
-        doc_ref = db.collection(ROOT_COLLECTION).document(dataset_name).collection("conversations").document(convo["conversation_id"])
-        doc_ref.set(convo)
+        _write_conversation(convo, dataset_name)
     except Exception as e:
         print(f"[ERROR] Failed to save conversation {convo.get('conversation_id')} to dataset '{dataset_name}': {e}")
+        # The shared copy may already hold the unsaved edit; reload it from Firestore
+        DATASETS.invalidate(dataset_name)
         raise  # Optional: re-raise to bubble up or handle elsewhere
 
 # ------------------------------
@@ -65,56 +176,85 @@ def save_conversations(convos, dataset_name):
 def create_dataset(dataset_name):
     if not dataset_name:
         raise ValueError("Dataset name cannot be empty.")
-    db.collection(ROOT_COLLECTION).document(dataset_name).set({})
+    from firebase_admin import firestore
+    batch = get_db().batch()
+    batch.set(get_db().collection(ROOT_COLLECTION).document(dataset_name), {})
+    batch.set(_catalog_ref(), {"datasets": {dataset_name: {
+        "conversations": 0,
+        "results": 0,
+        "last_modified": firestore.SERVER_TIMESTAMP,
+    }}}, merge=True)
+    batch.commit()
+    DATASETS.invalidate(dataset_name)
 
 # 🔹 Delete a dataset (including its conversations)
 def delete_dataset(dataset_name):
     if not dataset_name:
         raise ValueError("Dataset name cannot be empty.")
-    dataset_ref = db.collection(ROOT_COLLECTION).document(dataset_name)
+    from firebase_admin import firestore
+    dataset_ref = get_db().collection(ROOT_COLLECTION).document(dataset_name)
     # Delete all subcollection documents first
     conversations = dataset_ref.collection("conversations").list_documents()
     for convo in conversations:
         convo.delete()
     dataset_ref.delete()
+    _catalog_ref().set({"datasets": {dataset_name: firestore.DELETE_FIELD}}, merge=True)
+    DATASETS.invalidate(dataset_name)
 
 def delete_conversation(dataset_name, conversation_id):
     if not dataset_name or not conversation_id:
         raise ValueError("Both dataset_name and conversation_id are required")
-    db.collection(ROOT_COLLECTION).document(dataset_name).collection("conversations").document(conversation_id).delete()
+    from firebase_admin import firestore
+    doc_ref = _conversation_ref(dataset_name, conversation_id)
+    catalog_ref = _catalog_ref()
+
+    @firestore.transactional
+    def remove(transaction):
+        previous = _stored_result_count(doc_ref, transaction)
+        if previous is None:
+            return
+        transaction.delete(doc_ref)
+        transaction.set(catalog_ref, {"datasets": {dataset_name: _catalog_delta(-1, -previous)}}, merge=True)
+
+    remove(get_db().transaction())
+    DATASETS.conversation_deleted(dataset_name, conversation_id)
 
 def duplicate_conversation(source_convo, target_dataset, clear_results=False):
     convo_copy = dict(source_convo)
     if clear_results:
         convo_copy["results"] = []
 
-    doc_ref = (
-        db.collection("chat_reports")
-        .document(target_dataset)
-        .collection("conversations")
-        .document(convo_copy["conversation_id"])
-    )
-    doc_ref.set(convo_copy)
+    _write_conversation(convo_copy, target_dataset)
 
 def rename_dataset(old_name, new_name):
     if not old_name or not new_name:
         raise ValueError("Both old and new names are required.")
 
     # Check for conflict
-    existing = load_dataset_names()
-    if new_name in existing:
+    catalog = load_catalog()
+    if new_name in catalog:
         raise ValueError("A dataset with the new name already exists.")
 
     # Copy conversations to new dataset
-    old_ref = db.collection(ROOT_COLLECTION).document(old_name).collection("conversations")
-    new_ref = db.collection(ROOT_COLLECTION).document(new_name).collection("conversations")
+    old_ref = get_db().collection(ROOT_COLLECTION).document(old_name).collection("conversations")
+    new_ref = get_db().collection(ROOT_COLLECTION).document(new_name).collection("conversations")
 
+    conversations = 0
+    results = 0
     for doc in old_ref.stream():
-        new_ref.document(doc.id).set(doc.to_dict())
+        data = doc.to_dict()
+        new_ref.document(doc.id).set(data)
+        conversations += 1
+        results += len(data.get("results", []))
 
     # Delete old dataset
     delete_dataset(old_name)
     # Create metadata entry for new dataset
-    db.collection(ROOT_COLLECTION).document(new_name).set({})
-
-
+    from firebase_admin import firestore
+    get_db().collection(ROOT_COLLECTION).document(new_name).set({})
+    _catalog_ref().set({"datasets": {new_name: {
+        "conversations": conversations,
+        "results": results,
+        "last_modified": firestore.SERVER_TIMESTAMP,
+    }}}, merge=True)
+    DATASETS.invalidate(new_name)
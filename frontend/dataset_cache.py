@@ -0,0 +1,152 @@
+# dataset_cache.py – one in-memory copy of each open dataset, shared by every Streamlit session
+#
+# Sessions viewing the same dataset hold a DatasetLease instead of their own
+# loaded list: the first lease loads the dataset (concurrent sessions wait for
+# that single load), later ones reuse it, and the copy is dropped once the
+# last lease is released. Writes made through data_store update the shared
+# copy in place of a reload; conversation lists are replaced rather than
+# mutated, so a session iterating the previous list is never disturbed.
+# Cached conversations are shared: callers must treat them as read-only and
+# save edited copies instead.
+
+import copy
+import threading
+import weakref
+from collections import deque
+
+
+class DatasetLease:
+    """A session's hold on a cached dataset; released explicitly or when the session's state is dropped."""
+
+    def __init__(self, cache, name):
+        self.cache = cache
+        self.name = name
+        self._finalizer = weakref.finalize(self, cache._release, name)
+
+    @property
+    def conversations(self):
+        return self.cache.get(self.name)
+
+    def release(self):
+        self._finalizer()
+        self.cache.collect()
+
+
+class _Entry:
+    def __init__(self):
+        self.ready = threading.Event()
+        self.conversations = None
+        self.error = None
+
+
+class DatasetCache:
+    def __init__(self, loader, sort_key=None):
+        self._loader = loader
+        self._sort_key = sort_key
+        self._lock = threading.Lock()
+        self._leases = {}   # name -> live lease count
+        self._entries = {}  # name -> _Entry
+        # Releases queued by lease finalizers, applied under the lock by the next operation
+        self._released = deque()
+
+    def acquire(self, name):
+        with self._lock:
+            self._apply_releases()
+            self._leases[name] = self._leases.get(name, 0) + 1
+        lease = DatasetLease(self, name)
+        try:
+            self.get(name)
+        except BaseException:
+            lease.release()
+            raise
+        return lease
+
+    def get(self, name):
+        """Cached conversations of ``name``, loading them once if needed."""
+        with self._lock:
+            self._apply_releases()
+            entry = self._entries.get(name)
+            leader = entry is None
+            if leader:
+                entry = _Entry()
+                self._entries[name] = entry
+        if not leader:
+            entry.ready.wait()
+            if entry.error is not None:
+                raise entry.error
+            return entry.conversations
+
+        try:
+            entry.conversations = self._loader(name)
+        except BaseException as e:
+            entry.error = e
+            with self._lock:
+                if self._entries.get(name) is entry:
+                    del self._entries[name]
+            raise
+        finally:
+            entry.ready.set()
+        return entry.conversations
+
+    # ------------------------------
+    # 🔹 Write invalidation (called by data_store after successful writes)
+    # ------------------------------
+    def invalidate(self, name):
+        # Leases stay valid; the next access reloads
+        with self._lock:
+            self._apply_releases()
+            self._entries.pop(name, None)
+
+    def conversation_saved(self, name, convo):
+        def update(conversations):
+            for i, cached in enumerate(conversations):
+                if cached["conversation_id"] == convo["conversation_id"]:
+                    return conversations[:i] + [copy.deepcopy(convo)] + conversations[i + 1:]
+            updated = conversations + [copy.deepcopy(convo)]
+            if self._sort_key:
+                updated.sort(key=self._sort_key, reverse=True)
+            return updated
+
+        self._replace(name, update)
+
+    def conversation_deleted(self, name, conversation_id):
+        def update(conversations):
+            remaining = [c for c in conversations if c["conversation_id"] != conversation_id]
+            return remaining if len(remaining) != len(conversations) else None
+
+        self._replace(name, update)
+
+    def _replace(self, name, update):
+        with self._lock:
+            self._apply_releases()
+            entry = self._entries.get(name)
+            if entry is None:
+                return
+            if not entry.ready.is_set() or entry.error is not None:
+                # A load is in flight and may predate this write: make the next access reload
+                del self._entries[name]
+                return
+            updated = update(entry.conversations)
+            if updated is not None:
+                entry.conversations = updated
+
+    def _release(self, name):
+        # Runs from weakref finalizers, possibly during GC on a thread already holding
+        # self._lock, so it must not take the lock itself
+        self._released.append(name)
+
+    def _apply_releases(self):
+        # Caller holds self._lock
+        while self._released:
+            name = self._released.popleft()
+            remaining = self._leases.get(name, 0) - 1
+            if remaining > 0:
+                self._leases[name] = remaining
+            else:
+                self._leases.pop(name, None)
+                self._entries.pop(name, None)
+
+    def collect(self):
+        """Apply queued lease releases now, evicting datasets nobody holds."""
+        with self._lock:
+            self._apply_releases()
@@ -0,0 +1,89 @@
+# fingerprint.py – identify a simulation by everything that determines its output
+#
+# Results store the fingerprint of the inputs they were simulated from, so an
+# incremental Run All can skip conversations whose latest inputs (human
+# messages, prompt commit, model, variables, history settings) were already
+# simulated. The original AI replies in a conversation never reach the model
+# and are left out.
+#
+# Human messages are normalized first (Unicode NFC, whitespace collapsed), so
+# copies of a chat in different datasets share one content hash even if they
+# were re-exported; a Run All simulates each distinct content once.
+
+import hashlib
+import json
+import re
+import unicodedata
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(text):
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def _human_messages(content):
+    return [normalize_message(m["content"]) for m in content if m["role"] == "human"]
+
+
+def content_hash(content):
+    payload = json.dumps(_human_messages(content), separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def group_by_content(targets):
+    """``[(dataset, convo), ...]`` grouped by content hash, in first-seen order."""
+    groups = {}
+    for dataset, convo in targets:
+        groups.setdefault(content_hash(convo["content"]), []).append((dataset, convo))
+    return list(groups.values())
+
+
+def simulation_fingerprint(content, prompt_commit, model, variables, history_strategy="full", history_limit=None):
+    """Hash of the simulation inputs; None when the prompt commit is unknown, since nothing can be matched then."""
+    if not prompt_commit:
+        return None
+    payload = json.dumps(
+        [
+            content_hash(content),
+            prompt_commit,
+            model,
+            variables or {},
+            history_strategy or "full",
+            history_limit,
+        ],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def has_current_result(convo, fingerprint):
+    return fingerprint is not None and any(r.get("fingerprint") == fingerprint for r in convo.get("results", []))
+
+
+def plan_run(targets, prompt_commit, run):
+    """Group ``(dataset, convo)`` targets by content and drop copies that are already current.
+
+    Returns ``(groups, reusable, skipped)``: groups to simulate once each, ``(result, copies)``
+    pairs whose copies can take an identical conversation's current result, and the number
+    of copies left alone. Without a prompt commit nothing counts as current, so every
+    group is simulated.
+    """
+    groups, reusable, skipped = [], [], 0
+    for copies in group_by_content(targets):
+        fingerprint = simulation_fingerprint(copies[0][1]["content"], prompt_commit, run["model"], run["variables"],
+                                             run["history_strategy"], run["history_limit"])
+        if fingerprint is None:
+            groups.append(copies)
+            continue
+        stale = [(d, c) for d, c in copies if not has_current_result(c, fingerprint)]
+        skipped += len(copies) - len(stale)
+        if not stale:
+            continue
+        current = next((r for d, c in copies for r in c.get("results", []) if r.get("fingerprint") == fingerprint), None)
+        if current is not None:
+            reusable.append((current, stale))
+        else:
+            groups.append(stale)
+    return groups, reusable, skipped
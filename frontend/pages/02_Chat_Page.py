@@ -9,10 +9,15 @@ from math import ceil
 import sys, os
 import pytz
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 # Fix import path for shared modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from data_store import load_conversations, save_single_conversation, load_dataset_names, delete_conversation, duplicate_conversation
+from data_store import save_single_conversation, load_dataset_names, delete_conversation, duplicate_conversation, open_dataset, DATASETS
+from conversation_index import ConversationIndex
+from result_format import expand_output
+from fingerprint import simulation_fingerprint, plan_run
 
 # Load environment variables (from root)
 load_dotenv()
@@ -59,13 +64,23 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+# Conversations come from the process-wide dataset cache, shared with every other session;
+# the lease kept in session state releases this session's hold when it ends
+def open_conversations(dataset_name):
+    lease = st.session_state.get("dataset_lease")
+    if lease is None or lease.name != dataset_name:
+        if lease is not None:
+            lease.release()
+        lease = open_dataset(dataset_name)
+        st.session_state.dataset_lease = lease
+    return lease.conversations
+
 # ✅ Force sync of selected dataset (and reset old conversations + filters if dataset changed)
 selected = st.session_state.get("selected_dataset_name")
 prev = st.session_state.get("dataset_name")
 
 if selected and selected != prev:
     st.session_state.dataset_name = selected
-    st.session_state.conversations = load_conversations(selected)
     st.session_state.current_page = 1
     st.session_state.start_date = None
     st.session_state.end_date = None
@@ -77,9 +92,8 @@ if "dataset_name" not in st.session_state or not st.session_state.dataset_name:
     st.error("No dataset selected. Please go back and select a dataset.")
     st.stop()
 
-# Load conversations once
-if "conversations" not in st.session_state:
-    st.session_state.conversations = load_conversations(st.session_state.dataset_name)
+# Current shared copy (picks up other sessions' saves and deletes on every rerun)
+st.session_state.conversations = open_conversations(st.session_state.dataset_name)
 if "open_analyze_id" not in st.session_state:
     st.session_state.open_analyze_id = None
 if "open_view_id" not in st.session_state:
@@ -132,23 +146,126 @@ def fetch_prompt_variables(prompt_id):
     except:
         return []
 
-# Filtering helpers
-def is_within_range(convo_date):
+def fetch_prompt_commit(prompt_id):
+    # Commit the prompt currently resolves to; None if it cannot be determined
     try:
-        convo_dt = datetime.fromisoformat(convo_date.replace("Z", "+00:00")).date()
-        if start_date and convo_dt < start_date:
-            return False
-        if end_date and convo_dt > end_date:
-            return False
-        return True
+        res = requests.get(f"{BACKEND_URL}/prompt-commit", params={
+            "prompt_id": prompt_id,
+            "workspace": st.session_state.workspace
+        })
+        if res.status_code == 200:
+            return res.json().get("commit")
+        return None
     except:
-        return False
+        return None
+
+# History strategy options (backend/history.py); defaults match the backend
+HISTORY_STRATEGIES = {
+    "full": ("Full history", None),
+    "last_n": ("Last N turns", 6),
+    "token_budget": ("Token budget", 4000),
+    "summary": ("Rolling summary + last N turns", 6),
+}
 
-def matches_filters(convo):
-    if not is_within_range(convo["date_of_report"]): return False
-    if user_filter.strip() and user_filter.lower() not in convo.get("username", "").lower(): return False
-    if chat_id_filter.strip() and chat_id_filter.lower() not in convo.get("conversation_id", "").lower(): return False
-    return True
+def history_controls(key_prefix):
+    strategy = st.selectbox(
+        "History Strategy",
+        list(HISTORY_STRATEGIES.keys()),
+        format_func=lambda k: HISTORY_STRATEGIES[k][0],
+        key=f"{key_prefix}_history_strategy",
+    )
+    default_limit = HISTORY_STRATEGIES[strategy][1]
+    if default_limit is None:
+        return strategy, None
+    label = "Max history tokens" if strategy == "token_budget" else "Turns kept verbatim"
+    limit = st.number_input(label, min_value=1, value=default_limit, step=1, key=f"{key_prefix}_history_limit_{strategy}")
+    return strategy, int(limit)
+
+def history_form_fields(strategy, limit):
+    fields = {"history_strategy": strategy}
+    if limit is not None:
+        fields["history_limit"] = str(limit)
+    return fields
+
+# Usage helpers (results saved before usage tracking have no "usage" key)
+def sum_usage(usages):
+    total = {"prompt_tokens": 0, "completion_tokens": 0, "cache_read_tokens": 0, "cache_write_tokens": 0,
+             "latency_s": 0.0, "cost_usd": 0.0, "runs": 0}
+    for u in usages:
+        # Reused results were copied from an identical conversation and coalesced ones joined
+        # another request's simulation; their tokens were counted there
+        if not u or u.get("reused") or u.get("coalesced"):
+            continue
+        total["runs"] += 1
+        for key in ("prompt_tokens", "completion_tokens", "cache_read_tokens", "cache_write_tokens", "latency_s", "cost_usd"):
+            total[key] += u.get(key) or 0
+    return total
+
+def format_usage(u):
+    tokens = (u.get("prompt_tokens") or 0) + (u.get("completion_tokens") or 0)
+    text = f"{tokens:,} tokens ({u.get('prompt_tokens') or 0:,} in / {u.get('completion_tokens') or 0:,} out) · {u.get('latency_s') or 0:.1f}s model time"
+    if u.get("cache_read_tokens") or u.get("cache_write_tokens"):
+        text += f" · cache {u.get('cache_read_tokens') or 0:,} read / {u.get('cache_write_tokens') or 0:,} written"
+    if u.get("cost_usd"):
+        text += f" · ${u['cost_usd']:.4f}"
+    return text
+
+# Simulation requests: wait in small steps so the status stays live. A widget click reruns the
+# script and interrupts the wait, but the request keeps going and the next run picks it up
+# again; only ⏹ Stop Run cancels it in the backend.
+SIMULATE_POLL_SECONDS = 0.5
+
+def post_simulation(files, data, label):
+    key = (data["run_id"], data.get("dataset"), files["file"][1])
+    pending = st.session_state.get("pending_simulation")
+    if pending and pending["key"] == key:
+        future, started = pending["future"], pending["started"]
+    else:
+        pool = ThreadPoolExecutor(max_workers=1)
+        future = pool.submit(requests.post, f"{BACKEND_URL}/simulate", files=files, data=data)
+        pool.shutdown(wait=False)
+        started = time.time()
+        st.session_state.pending_simulation = {"key": key, "future": future, "started": started}
+    status = st.empty()
+    while not future.done():
+        status.caption(f"⏳ {label} · {time.time() - started:.0f}s")
+        time.sleep(SIMULATE_POLL_SECONDS)
+    status.empty()
+    st.session_state.pop("pending_simulation", None)
+    return future.result()
+
+def cancel_pending_simulation(run_id):
+    pending = st.session_state.pop("pending_simulation", None)
+    if pending and not pending["future"].done():
+        try:
+            requests.post(f"{BACKEND_URL}/runs/{run_id}/cancel", timeout=5)
+        except requests.RequestException:
+            pass
+
+# Filtering helpers: the index is rebuilt only when the conversation list itself changes
+def get_conversation_index():
+    index = st.session_state.get("conversation_index")
+    if index is None or not index.matches(st.session_state.conversations):
+        index = ConversationIndex(st.session_state.conversations)
+        st.session_state.conversation_index = index
+    return index
+
+def get_dataset_usage():
+    # Summed once per conversation list; saves replace the list, so a new result is picked up
+    conversations = st.session_state.conversations
+    cached = st.session_state.get("dataset_usage")
+    if cached is None or cached[0] is not conversations or cached[1] != len(conversations):
+        usage = sum_usage(r.get("usage") for c in conversations for r in c.get("results", []))
+        cached = (conversations, len(conversations), usage)
+        st.session_state.dataset_usage = cached
+    return cached[2]
+
+def other_dataset_names():
+    # Read once per open dataset (and on ⟳ Refresh) rather than on every rerun
+    if st.session_state.get("dataset_names_for") != st.session_state.dataset_name:
+        st.session_state.dataset_names = load_dataset_names()
+        st.session_state.dataset_names_for = st.session_state.dataset_name
+    return [d for d in st.session_state.dataset_names if d != st.session_state.dataset_name]
 
 # Title and back navigation
 st.title("Evaluation Dashboard")
@@ -180,7 +297,10 @@ if selected_workspace and selected_workspace != st.session_state.get("prev_works
     st.session_state.prev_workspace = selected_workspace
 
 if st.button("⟳ Refresh Conversations"):
-    st.session_state.conversations = load_conversations(st.session_state.dataset_name)
+    # Reloads the shared copy for every session viewing this dataset
+    DATASETS.invalidate(st.session_state.dataset_name)
+    st.session_state.conversations = open_conversations(st.session_state.dataset_name)
+    st.session_state.dataset_names_for = None
     st.success(f"Refreshed dataset: {st.session_state.dataset_name}")
 
 
@@ -210,7 +330,8 @@ per_page = 10
 if "current_page" not in st.session_state:
     st.session_state.current_page = 1
 
-filtered_conversations = [c for c in st.session_state.conversations if matches_filters(c)]
+conversation_index = get_conversation_index()
+filtered_conversations = conversation_index.filter(start_date, end_date, user_filter, chat_id_filter)
 
 total_pages = max(1,ceil(len(filtered_conversations) / per_page))
 start = (st.session_state.current_page - 1) * per_page
@@ -220,10 +341,16 @@ if not displayed:
     st.warning("No conversations found with the current filters.")
 
 st.markdown(f"### Simulate All – **{st.session_state.dataset_name}**")
+dataset_usage = get_dataset_usage()
+if dataset_usage["runs"]:
+    st.caption(f"Dataset usage across {dataset_usage['runs']} simulation(s): {format_usage(dataset_usage)}")
+if "pending_run_usage" in st.session_state:
+    st.info(st.session_state.pop("pending_run_usage"))
 selected_prompt = st.selectbox("Select Prompt", [""] + st.session_state.prompt_list, key="dataset_prompt")
 selected_family = st.selectbox("Select Model Family", list(MODEL_OPTIONS.keys()), key="model_family")
 selected_submodel = st.selectbox("Select Submodel", MODEL_OPTIONS[selected_family], key="submodel")
 selected_model = f"{selected_family}:{selected_submodel}"
+dataset_history_strategy, dataset_history_limit = history_controls("dataset")
 
 if selected_prompt:
     if not st.session_state.workspace:
@@ -238,48 +365,192 @@ for var in prompt_vars:
     dataset_variable_values[var] = val.strip() if val.strip() else f"@{var}@"
 
 
+def dataset_conversations(dataset_name):
+    # Other datasets of a run are held for as long as the run is active, so reruns reuse the cached copy
+    if dataset_name == st.session_state.dataset_name:
+        return st.session_state.conversations
+    leases = st.session_state.setdefault("sweep_leases", {})
+    if dataset_name not in leases:
+        leases[dataset_name] = open_dataset(dataset_name)
+    return leases[dataset_name].conversations
+
+def release_sweep_leases(keep=()):
+    leases = st.session_state.get("sweep_leases", {})
+    for dataset_name in [d for d in leases if d not in keep]:
+        leases.pop(dataset_name).release()
+
+def save_result(result, copies, run_id):
+    # The first copy owns the usage; the others reuse the output without new model calls
+    for n, (dataset, convo) in enumerate(copies):
+        if n or result.get("run_id") != run_id:
+            result = {**result, "run_id": run_id, "usage": {**(result.get("usage") or {}), "reused": True}}
+        # Saved as a new dict: the loaded one is shared with other sessions through the dataset cache
+        save_single_conversation({**convo, "results": convo.get("results", []) + [result]}, dataset)
+
+def execute_run(run, targets):
+    """Simulate ``(dataset, convo)`` targets for a Run All; the same run_id lets the backend resume partial chats.
+
+    Identical conversations (by normalized content, also across datasets) are simulated once
+    and the result is saved to every copy.
+    """
+    groups, reusable, skipped = plan_run(targets, run.get("prompt_commit"), run)
+    failed = []
+    run_usages = []
+    reused = 0
+    # Kept until the run completes, so a stopped run can be resumed
+    st.session_state.active_run = run
+    # Other clicks rerun the page and the run carries on from there; this one stops it
+    st.session_state.run_in_progress = True
+    st.button("⏹ Stop Run", key="stop_run")
+    for result, copies in reusable:
+        save_result(result, copies, run["run_id"])
+        reused += len(copies)
+    for i, copies in enumerate(groups, start=1):
+        dataset, convo = copies[0]
+        label = f"Simulating {i}/{len(groups)}: {convo['conversation_id']}"
+        if len(copies) > 1:
+            label += f" (+{len(copies) - 1} identical)"
+        json_payload = json.dumps(convo["content"])
+        files = {"file": ("chat.json", json_payload, "application/json")}
+        data = {
+            "prompt_id": run["prompt_id"],
+            "model_name": run["model"],
+            "variables_json": json.dumps(run["variables"]),
+            "workspace": run["workspace"],
+            "include_usage": "true",
+            "run_id": run["run_id"],
+            "dataset": dataset,
+            "priority": "batch",
+            **history_form_fields(run["history_strategy"], run["history_limit"])
+        }
+        try:
+            res = post_simulation(files, data, label)
+            if res.status_code == 200:
+                body = res.json()
+                run_usages.append(body["usage"])
+                save_result({
+                    "time": datetime.now().strftime("%Y-%m-%d %H:%M"),
+                    "prompt_id": run["prompt_id"],
+                    "model": run["model"],
+                    "variables": run["variables"],
+                    "output": body["history"],
+                    "usage": body["usage"],
+                    "history": {"strategy": run["history_strategy"], "limit": run["history_limit"]},
+                    "run_id": run["run_id"],
+                    "prompt_commit": body["usage"].get("prompt_commit"),
+                    "fingerprint": simulation_fingerprint(
+                        convo["content"], body["usage"].get("prompt_commit"), run["model"], run["variables"],
+                        run["history_strategy"], run["history_limit"]
+                    )
+                }, copies, run["run_id"])
+                reused += len(copies) - 1
+            else:
+                failed.extend((d, c["conversation_id"], res.status_code, res.text) for d, c in copies)
+                st.error(f"❌ Error simulating chat {convo['conversation_id']}: {res.status_code} - {res.text}")
+        except Exception as e:
+            failed.extend((d, c["conversation_id"], "Exception", str(e)) for d, c in copies)
+            st.error(f"❌ Exception simulating chat {convo['conversation_id']}: {e}")
+    st.session_state.run_in_progress = False
+    if failed:
+        st.warning(f"{len(failed)} conversation(s) failed.")
+    else:
+        st.success("All conversations simulated successfully.")
+        st.session_state.active_run = None
+    if run_usages or reused or skipped:
+        summary = f"Run usage ({len(run_usages)} simulation(s)): {format_usage(sum_usage(run_usages))}"
+        if reused:
+            summary += f" · {reused} identical copy(ies) filled without new model calls"
+        if skipped:
+            summary += f" · {skipped} unchanged conversation(s) skipped"
+        st.session_state.pending_run_usage = summary
+
+    # 🔄 trigger table refresh so every Sim Count updates right away
+    st.session_state["sim_refresh_all"] = time.time()
+    st.rerun()
+
+def pending_targets(run):
+    # Targets of the run that have no result saved under its run_id yet
+    wanted = {}
+    for dataset, conversation_id in run["targets"]:
+        wanted.setdefault(dataset, set()).add(conversation_id)
+    return [
+        (dataset, c)
+        for dataset, ids in wanted.items()
+        for c in dataset_conversations(dataset)
+        if c["conversation_id"] in ids and not any(r.get("run_id") == run["run_id"] for r in c.get("results", []))
+    ]
+
+# Nothing left to resume: let go of the other datasets the last run used
+if not st.session_state.get("active_run"):
+    release_sweep_leases()
+
+incremental_run = st.checkbox(
+    "Skip unchanged conversations",
+    value=True,
+    key="incremental_run",
+    help="Only simulate conversations that are new or whose messages, prompt version, model, variables or history settings changed since their last result.",
+)
+sweep_datasets = st.multiselect(
+    "Also run on datasets",
+    other_dataset_names(),
+    key="sweep_datasets",
+    help="All conversations of these datasets are included. Identical conversations are simulated once and the result is saved to every copy.",
+)
+
 if st.button("Run All", key="run_all", type="primary"):
     if not st.session_state.workspace:
         st.warning("Please select a workspace before running simulation.")
     elif not selected_prompt:
         st.warning("Please select a prompt before running simulation.")
     else:
-        failed = []
-        for convo in filtered_conversations:
-            json_payload = json.dumps(convo["content"])
-            files = {"file": ("chat.json", json_payload, "application/json")}
-            data = {
-                "prompt_id": selected_prompt,
-                "model_name": selected_model,
-                "variables_json": json.dumps(dataset_variable_values),
-                "workspace": st.session_state.workspace
-            }
-            try:
-                res = requests.post(f"{BACKEND_URL}/simulate", files=files, data=data)
-                if res.status_code == 200:
-                    output = res.json()
-                    convo["results"].append({
-                        "time": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                        "prompt_id": selected_prompt,
-                        "model": selected_model,
-                        "variables": dataset_variable_values,
-                        "output": output
-                    })
-                    save_single_conversation(convo, st.session_state.dataset_name)
-                else:
-                    failed.append((convo["conversation_id"], res.status_code, res.text))
-                    st.error(f"❌ Error simulating chat {convo['conversation_id']}: {res.status_code} - {res.text}")
-            except Exception as e:
-                failed.append((convo["conversation_id"], "Exception", str(e)))
-                st.error(f"❌ Exception simulating chat {convo['conversation_id']}: {e}")
-        if failed:
-            st.warning(f"{len(failed)} conversation(s) failed.")
+        run = {
+            "run_id": uuid.uuid4().hex,
+            "dataset": st.session_state.dataset_name,
+            "workspace": st.session_state.workspace,
+            "prompt_id": selected_prompt,
+            "model": selected_model,
+            "variables": dataset_variable_values,
+            "history_strategy": dataset_history_strategy,
+            "history_limit": dataset_history_limit,
+            "prompt_commit": None,
+        }
+        # Replaces any unfinished run; keep only the datasets this one still needs
+        if st.session_state.get("active_run"):
+            cancel_pending_simulation(st.session_state.active_run["run_id"])
+        release_sweep_leases(keep=sweep_datasets)
+        targets = [(st.session_state.dataset_name, c) for c in filtered_conversations]
+        for dataset in sweep_datasets:
+            targets.extend((dataset, c) for c in dataset_conversations(dataset))
+        if incremental_run:
+            run["prompt_commit"] = fetch_prompt_commit(selected_prompt)
+            if not run["prompt_commit"]:
+                st.warning("Could not resolve the prompt version; simulating every conversation.")
+        groups, reusable, skipped = plan_run(targets, run["prompt_commit"], run)
+        run["targets"] = [[d, c["conversation_id"]] for copies in groups + [c for _, c in reusable] for d, c in copies]
+        if not run["targets"]:
+            st.info(f"All {len(targets)} conversation(s) already have results for these inputs.")
         else:
-            st.success("All conversations simulated successfully.")
-        
-        # 🔄 trigger table refresh so every Sim Count updates right away
-        st.session_state["sim_refresh_all"] = time.time()
-        st.rerun()
+            st.caption(
+                f"{len(targets)} conversation(s): {len(groups)} distinct to simulate, "
+                f"{len(run['targets']) - len(groups)} identical copy(ies) reuse a result, {skipped} unchanged skipped."
+            )
+            execute_run(run, targets)
+
+active_run = st.session_state.get("active_run")
+if active_run and st.session_state.get("stop_run"):
+    cancel_pending_simulation(active_run["run_id"])
+    st.session_state.run_in_progress = False
+if active_run and active_run["dataset"] == st.session_state.dataset_name:
+    remaining = pending_targets(active_run)
+    if st.session_state.get("run_in_progress"):
+        # Interrupted by an ordinary rerun (a filter, View, a page change): keep going
+        execute_run(active_run, remaining)
+    st.info(
+        f"Last run ({active_run['prompt_id']} · {active_run['model']}) stopped with "
+        f"{len(remaining)} of {len(active_run['targets'])} conversation(s) unfinished."
+    )
+    if st.button("↻ Resume Run", key="resume_run"):
+        execute_run(active_run, remaining)
 
 # ---------- Header Row ----------
 col_sizes = [2, 3, 5, 5, 2, 3, 3] 
@@ -296,13 +567,7 @@ header_cols[6].markdown("**Simulate**")
 for convo in displayed:
     cols = st.columns(col_sizes)
     cols[1].write(convo["username"])
-    try:
-        dt_obj = datetime.fromisoformat(convo["date_of_report"].replace("Z", "+00:00"))
-        local_time = dt_obj.astimezone(user_tz)
-        formatted_time = local_time.strftime("%b %d, %Y - %I:%M %p")
-    except:
-        formatted_time = convo["date_of_report"]
-    cols[2].write(formatted_time)
+    cols[2].write(conversation_index.local_time(convo, user_tz))
     cols[3].write(convo["conversation_id"])
     cols[4].write(str(len(convo.get("results", []))))
 
@@ -351,7 +616,15 @@ for convo in displayed:
                         "<div style='margin-left:20px; opacity:0.5;'><em>No variables for this prompt.</em></div>",
                         unsafe_allow_html=True,
                     )
-                for m in res["output"]:
+                if res.get("history") and res["history"]["strategy"] != "full":
+                    label = HISTORY_STRATEGIES.get(res["history"]["strategy"], (res["history"]["strategy"],))[0]
+                    st.markdown(f"**History**: {label} ({res['history']['limit']})")
+                if res.get("usage"):
+                    st.markdown(f"**Usage**: {format_usage(res['usage'])}")
+                    turn_tokens = [t.get("prompt_tokens") for t in res["usage"].get("turns", [])]
+                    if any(turn_tokens):
+                        st.caption("Prompt tokens per turn: " + " → ".join(str(t or "?") for t in turn_tokens))
+                for m in expand_output(res, convo["content"]):
                     bubble_color = "#2a2d32" if m["role"] == "human" else "#1e4023"
                     st.markdown(f"<div style='background-color:{bubble_color}; padding:10px 15px; border-radius:10px; margin:8px 0; color:#f0f0f0;'><strong>{m['role'].capitalize()}:</strong><br>{m['content']}</div>", unsafe_allow_html=True)
                 st.markdown("---")
@@ -368,6 +641,7 @@ for convo in displayed:
         selected_family = st.selectbox("Select Model Family", list(MODEL_OPTIONS.keys()), key=family_key)
         selected_submodel = st.selectbox("Select Submodel", MODEL_OPTIONS[selected_family], key=submodel_key)
         selected_model = f"{selected_family}:{selected_submodel}"
+        history_strategy, history_limit = history_controls(convo["conversation_id"])
 
         if selected_prompt:
             if not st.session_state.workspace:
@@ -387,6 +661,11 @@ for convo in displayed:
             elif not selected_prompt:
                 st.warning("Please select a prompt before running simulation.")
             else:
+                # Reused on retry so the backend resumes from the last completed turn
+                run_key = f"run_id_{convo['conversation_id']}"
+                if run_key not in st.session_state:
+                    st.session_state[run_key] = uuid.uuid4().hex
+                single_run_id = st.session_state[run_key]
                 try:
                     json_payload = json.dumps(convo["content"])
                     files = {"file": ("chat.json", json_payload, "application/json")}
@@ -394,21 +673,38 @@ for convo in displayed:
                         "prompt_id": selected_prompt,
                         "model_name": selected_model,
                         "variables_json": json.dumps(variable_values),
-                        "workspace": st.session_state.workspace
+                        "workspace": st.session_state.workspace,
+                        "include_usage": "true",
+                        "run_id": single_run_id,
+                        "dataset": st.session_state.dataset_name,
+                        # Served ahead of bulk Run All traffic
+                        "priority": "interactive",
+                        **history_form_fields(history_strategy, history_limit)
                     }
 
-                    res = requests.post(f"{BACKEND_URL}/simulate", files=files, data=data)
+                    res = post_simulation(files, data, f"Simulating {convo['conversation_id']}")
 
                     if res.status_code == 200:
-                        output = res.json()
-                        convo["results"].append({
+                        body = res.json()
+                        result = {
                             "time": datetime.now().strftime("%Y-%m-%d %H:%M"),
                             "prompt_id": selected_prompt,
                             "model": selected_model,
                             "variables": variable_values,
-                            "output": output
-                        })
-                        save_single_conversation(convo, st.session_state.dataset_name)
+                            "output": body["history"],
+                            "usage": body["usage"],
+                            "history": {"strategy": history_strategy, "limit": history_limit},
+                            "run_id": single_run_id,
+                            "prompt_commit": body["usage"].get("prompt_commit"),
+                            "fingerprint": simulation_fingerprint(
+                                convo["content"], body["usage"].get("prompt_commit"), selected_model,
+                                variable_values, history_strategy, history_limit
+                            )
+                        }
+                        del st.session_state[run_key]
+                        # A new dict, never the shared cached one (see save_result)
+                        save_single_conversation({**convo, "results": convo.get("results", []) + [result]},
+                                                 st.session_state.dataset_name)
                         # 🔄 Trigger table refresh so Sim Count updates immediately
                         st.session_state[f"sim_refresh_{convo['conversation_id']}"] = time.time()
                         st.success("Simulation completed.")
@@ -433,12 +729,12 @@ for convo in displayed:
         if st.button("🗑️ Delete this Chat", key=f"delete_{convo['conversation_id']}"):
             delete_conversation(st.session_state.dataset_name, convo["conversation_id"])
             st.success(f"Chat {convo['conversation_id']} deleted.")
-            st.session_state.conversations = load_conversations(st.session_state.dataset_name)
+            st.session_state.conversations = open_conversations(st.session_state.dataset_name)
             st.rerun()
         with st.expander("⧉ Duplicate this Chat"):
             target_dataset = st.selectbox(
                 "Select destination dataset",
-                [d for d in load_dataset_names() if d != st.session_state.dataset_name],
+                other_dataset_names(),
                 key=f"copy_target_{convo['conversation_id']}"
             )
 
@@ -0,0 +1,63 @@
+# result_format.py – compact storage of simulation results
+#
+# A result's "output" is the whole simulated history: every human message of
+# the source conversation followed by the simulated AI reply. Only the AI
+# replies are new, so results are stored as
+#   {"output_format": "ai_turns_v1", "ai_turns": [...]}               or
+#   {"output_format": "ai_turns_v1", "ai_turns_z": <zlib JSON bytes>}
+# aligned by index with the human messages in convo["content"], and expanded
+# again with expand_output() when displayed.
+
+import json
+import os
+import zlib
+
+COMPACT_FORMAT = "ai_turns_v1"
+COMPRESS_RESULTS = os.getenv("COMPRESS_RESULTS", "1") != "0"
+COMPRESS_MIN_BYTES = 512
+
+
+def _human_messages(content):
+    return [m["content"] for m in content if m["role"] == "human"]
+
+
+def compact_result(result, content, compress=COMPRESS_RESULTS):
+    """Storage form of ``result``; returned unchanged if it is already compact or does not align."""
+    output = result.get("output")
+    if output is None or result.get("output_format") == COMPACT_FORMAT:
+        return result
+
+    humans = [m["content"] for m in output if m["role"] == "human"]
+    ai_turns = [m["content"] for m in output if m["role"] == "ai"]
+    expected = [m for pair in zip(humans, ai_turns) for m in pair]
+    if humans != _human_messages(content) or [m["content"] for m in output] != expected:
+        # Not a plain human/ai alternation over this conversation; keep the full history
+        return result
+
+    compact = {k: v for k, v in result.items() if k != "output"}
+    compact["output_format"] = COMPACT_FORMAT
+    encoded = json.dumps(ai_turns, separators=(",", ":")).encode("utf-8")
+    if compress and len(encoded) >= COMPRESS_MIN_BYTES:
+        compact["ai_turns_z"] = zlib.compress(encoded, 6)
+    else:
+        compact["ai_turns"] = ai_turns
+    return compact
+
+
+def compact_results(convo, compress=COMPRESS_RESULTS):
+    return [compact_result(r, convo.get("content", []), compress) for r in convo.get("results", [])]
+
+
+def expand_output(result, content):
+    """The full simulated history for ``result``, whichever format it was stored in."""
+    if result.get("output_format") != COMPACT_FORMAT:
+        return result.get("output", [])
+    if "ai_turns_z" in result:
+        ai_turns = json.loads(zlib.decompress(bytes(result["ai_turns_z"])).decode("utf-8"))
+    else:
+        ai_turns = result.get("ai_turns", [])
+    output = []
+    for human, ai in zip(_human_messages(content), ai_turns):
+        output.append({"role": "human", "content": human})
+        output.append({"role": "ai", "content": ai})
+    return output